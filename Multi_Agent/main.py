@@ -1,13 +1,25 @@
 import os
-import json
 import asyncio
 import logging
 import sys
-from typing import Any, Dict, List
-from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
+import re
+import hashlib
+import functools
+import threading
+import shutil
+import tempfile
+from typing import Any, Dict, List, Tuple
+import numpy as np
+import onnxruntime as ort
+from transformers import AutoTokenizer
+from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+from optimum.onnxruntime.configuration import AutoQuantizationConfig
+from cachetools import LRUCache, TTLCache
+from diskcache import Cache
 from neo4j import GraphDatabase, basic_auth
 from dotenv import load_dotenv
 import ollama
+import orjson
 
 # Load environment variables
 load_dotenv()
@@ -24,59 +36,320 @@ logger = logging.getLogger(__name__)
 NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "password")
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE", "neo4j")
+
+CRYPTOBERT_MODEL = "ElKulako/cryptobert"
+CRYPTOBERT_INT8_DIR = os.getenv("CRYPTOBERT_INT8_DIR", "cryptobert-int8")
+# What a finished quantization leaves in CRYPTOBERT_INT8_DIR
+CRYPTOBERT_INT8_FILES = ("model_quantized.onnx", "config.json", "tokenizer_config.json")
 
 # Initialize Neo4j driver
 driver = GraphDatabase.driver(NEO4J_URI, auth=basic_auth(NEO4J_USER, NEO4J_PASSWORD))
 
-# Initialize CryptoBERT pipeline
-pipe = pipeline("text-classification", model="ElKulako/cryptobert")
-tokenizer = AutoTokenizer.from_pretrained("ElKulako/cryptobert")
-model = AutoModelForSequenceClassification.from_pretrained("ElKulako/cryptobert")
+def quantize_cryptobert():
+    """Export CryptoBERT to ONNX and write an INT8 copy (plus config and tokenizer) to CRYPTOBERT_INT8_DIR.
+
+    The FP32 export only lives inside this function, so it is released
+    before the quantized session is loaded. Everything is written to a temporary
+    directory that only replaces CRYPTOBERT_INT8_DIR once it is complete.
+    """
+    logger.info(f"Quantizing {CRYPTOBERT_MODEL} to INT8 in '{CRYPTOBERT_INT8_DIR}'")
+    target = os.path.abspath(CRYPTOBERT_INT8_DIR)
+    work_dir = tempfile.mkdtemp(prefix=".cryptobert-int8-", dir=os.path.dirname(target))
+    try:
+        fp32_model = ORTModelForSequenceClassification.from_pretrained(CRYPTOBERT_MODEL, export=True)
+        quantizer = ORTQuantizer.from_pretrained(fp32_model)
+        qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=work_dir, quantization_config=qconfig)
+        fp32_model.config.save_pretrained(work_dir)
+        AutoTokenizer.from_pretrained(CRYPTOBERT_MODEL, use_fast=True).save_pretrained(work_dir)
+        # A leftover from an interrupted run is replaced, not trusted
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        os.rename(work_dir, target)
+    except BaseException:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+
+def quantized_cryptobert_ready() -> bool:
+    """True once CRYPTOBERT_INT8_DIR holds every artifact of a finished quantization."""
+    return all(os.path.isfile(os.path.join(CRYPTOBERT_INT8_DIR, name)) for name in CRYPTOBERT_INT8_FILES)
+
+def load_quantized_cryptobert() -> ORTModelForSequenceClassification:
+    """Load CryptoBERT as a dynamically quantized INT8 ONNX Runtime model.
+
+    The ONNX export and quantization only run once; later starts load the
+    quantized model straight from CRYPTOBERT_INT8_DIR.
+    """
+    session_options = ort.SessionOptions()
+    session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session_options.intra_op_num_threads = max(1, (os.cpu_count() or 2) // 2)
+    return ORTModelForSequenceClassification.from_pretrained(
+        CRYPTOBERT_INT8_DIR,
+        file_name="model_quantized.onnx",
+        session_options=session_options
+    )
+
+# Initialize CryptoBERT (INT8 ONNX Runtime) - the only copy of the model held in memory
+if not quantized_cryptobert_ready():
+    quantize_cryptobert()
+tokenizer = AutoTokenizer.from_pretrained(CRYPTOBERT_INT8_DIR, use_fast=True)
+model = load_quantized_cryptobert()
+
+# Classification batching
+MAX_BATCH = 16
+MAX_WAIT_MS = 5
+TOKENIZE_CACHE_SIZE = 2048
+
+# Caching
+CLASSIFY_CACHE_SIZE = 4096
+CONTEXT_CACHE_SIZE = 512
+CONTEXT_CACHE_TTL = 300
+
+# LLM generation (Ollama ignores 'max_tokens'; num_predict is the output token cap)
+LLM_MODELS = ['qwen2.5', 'deepseek-r1']
+LLM_KEEP_ALIVE = '30m'
+LLM_OPTIONS = {'temperature': 0.7, 'num_ctx': 2048, 'num_predict': 512}
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", "/tmp/llm")
+LLM_CACHE_TTL = 3600
+
+@functools.lru_cache(maxsize=TOKENIZE_CACHE_SIZE)
+def encode_query(query: str) -> Dict[str, List[int]]:
+    """Tokenize a single query (unpadded) with the fast Rust tokenizer, cached per query string."""
+    return dict(tokenizer(query, truncation=True))
+
+def classify_batch(queries: List[str]) -> List[Dict[str, Any]]:
+    """Classify several queries with a single CryptoBERT forward pass."""
+    # Per-query encodings come from the cache; only padding to the batch length happens per call
+    encoded = tokenizer.pad([dict(encode_query(query)) for query in queries], return_tensors="np")
+    logits = model(**encoded).logits
+    probs = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    probs /= probs.sum(axis=-1, keepdims=True)
+    label_ids = probs.argmax(axis=-1)
+    return [
+        {
+            "label": model.config.id2label[int(label_id)],
+            "score": float(row[label_id])
+        }
+        for row, label_id in zip(probs, label_ids)
+    ]
+
+class ClassificationBatcher:
+    """Collects concurrent classify requests and runs them as one batch."""
+
+    def __init__(self, max_batch: int = MAX_BATCH, max_wait_ms: int = MAX_WAIT_MS):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue: asyncio.Queue = None
+        self._worker: asyncio.Task = None
+
+    async def submit(self, query: str) -> Dict[str, Any]:
+        """Queue a query and wait for its classification."""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[Tuple[str, asyncio.Future]] = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            queries = [query for query, _ in batch]
+            try:
+                results = await asyncio.to_thread(classify_batch, queries)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+classify_batcher = ClassificationBatcher()
+
+def serialize_context(context: List[Dict[str, Any]]) -> str:
+    """Serialize graph context for a prompt in one orjson call."""
+    return orjson.dumps(context, option=orjson.OPT_INDENT_2).decode()
+
+# Cypher kept as fixed text so Neo4j reuses the cached execution plans
+TOPIC_CONTEXT_QUERY = """
+MATCH (n)-[:COVERS_TOPIC]->(t:Topic {name: $topic})
+RETURN n, t LIMIT $limit
+"""
+
+# One fixed query per known label: the label must be in the pattern for Neo4j to use
+# its index, and only whitelisted labels are ever interpolated into Cypher
+RELATED_ENTITIES_QUERIES = {
+    label: f"""
+MATCH (n:{label} {{id: $entity_id}})-[r]-(m)
+RETURN type(r) AS relationship, m.id AS target
+LIMIT $limit
+"""
+    for label in ("Topic", "Protocol", "EndpointData", "RedditPost", "NewsArticle", "GitHubRepo")
+}
 
 # Graph Querying Module
 class Neo4jGraph:
-    def __init__(self, driver):
+    def __init__(self, driver, database: str = NEO4J_DATABASE):
         self.driver = driver
+        self.database = database
+        # Sessions are not thread-safe; keep one long-lived session per worker thread
+        self._local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+        self._ctx_cache = TTLCache(maxsize=CONTEXT_CACHE_SIZE, ttl=CONTEXT_CACHE_TTL)
+        self._ctx_lock = threading.Lock()
+        self._ctx_stats = {"hits": 0, "misses": 0}
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self.driver.session(database=self.database)
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
 
     def run_query(self, query: str, params: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """Run a Cypher query and return results."""
-        with self.driver.session() as session:
-            result = session.run(query, params or {})
-            return [record.data() for record in result]
+        result = self._session().run(query, params or {})
+        return [record.data() for record in result]
+
+    def run_query_values(self, query: str, params: Dict[str, Any] = None) -> List[List[Any]]:
+        """Run a Cypher query and return plain value rows (no per-record dict)."""
+        return self._session().run(query, params or {}).values()
+
+    def warm_up(self, topics: List[str], limit: int = 10):
+        """EXPLAIN the topic query up front so its plan is cached before the first user query."""
+        for topic in topics:
+            self._session().run("EXPLAIN " + TOPIC_CONTEXT_QUERY, {"topic": topic, "limit": limit}).consume()
+
+    def close(self):
+        """Close every session opened by this graph."""
+        with self._sessions_lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions.clear()
+        self._local = threading.local()
+
+    def fetch_context_with_text(self, topic: str, limit: int = 10) -> Tuple[List[Dict[str, Any]], str]:
+        """Fetch context for a topic together with its serialized JSON (both cached for CONTEXT_CACHE_TTL seconds)."""
+        key = (topic, limit)
+        with self._ctx_lock:
+            if key in self._ctx_cache:
+                self._ctx_stats["hits"] += 1
+                return self._ctx_cache[key]
+            self._ctx_stats["misses"] += 1
+
+        context = self.run_query(TOPIC_CONTEXT_QUERY, {"topic": topic, "limit": limit})
+        entry = (context, serialize_context(context))
+        with self._ctx_lock:
+            self._ctx_cache[key] = entry
+        return entry
 
     def fetch_context_for_topic(self, topic: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Fetch context related to a specific topic."""
-        query = """
-        MATCH (n)-[:COVERS_TOPIC]->(t:Topic {name: $topic})
-        RETURN n, t LIMIT $limit
-        """
-        return self.run_query(query, {"topic": topic, "limit": limit})
+        """Fetch context related to a specific topic (cached for CONTEXT_CACHE_TTL seconds)."""
+        return self.fetch_context_with_text(topic, limit)[0]
 
-    def fetch_related_entities(self, entity_type: str, entity_id: str) -> List[Dict[str, Any]]:
-        """Fetch entities related to a given node."""
-        query = f"""
-        MATCH (n:{entity_type} {{id: $entity_id}})-[r]-()
-        RETURN type(r) AS relationship, collect(properties(r)) AS relations
-        """
-        return self.run_query(query, {"entity_id": entity_id})
+    def cache_info(self) -> Dict[str, int]:
+        """Return hit/miss counters and current size of the context cache."""
+        with self._ctx_lock:
+            return {**self._ctx_stats, "size": len(self._ctx_cache)}
+
+    def fetch_related_entities(self, entity_type: str, entity_id: str, limit: int = 100) -> List[List[Any]]:
+        """Fetch (relationship type, target id) rows for entities related to a given node."""
+        query = RELATED_ENTITIES_QUERIES.get(entity_type)
+        if query is None:
+            raise ValueError(f"Unknown entity type: {entity_type!r}")
+        return self.run_query_values(query, {"entity_id": entity_id, "limit": limit})
 
 # Base Agent Class
 class BaseAgent:
+    # Shared by all agents: classification is a pure function of the query
+    _classify_cache = LRUCache(maxsize=CLASSIFY_CACHE_SIZE)
+    _classify_stats = {"hits": 0, "misses": 0}
+    # One Ollama client (and HTTP connection pool) shared by every agent
+    ollama_client = ollama.AsyncClient()
+    # Content-addressed (prompt hash + model) completion cache, shared across agents and runs
+    _llm_cache = Cache(LLM_CACHE_DIR)
+    _llm_stats = {"hits": 0, "misses": 0}
+
     def __init__(self, graph: Neo4jGraph):
         self.graph = graph
-        self.ollama_client = ollama.AsyncClient()
-
-    def classify_query(self, query: str) -> Dict[str, Any]:
-        """Classify the user query using CryptoBERT."""
-        result = pipe(query)[0]
-        return {
-            "label": result["label"],
-            "score": result["score"]
-        }
 
-    def _format_prompt(self, context: List[Dict[str, Any]], classification: Dict[str, Any]) -> str:
+    @classmethod
+    async def warm_up_models(cls):
+        """
+        Load every LLM into Ollama up front so the first query doesn't pay the model load.
+        Best effort: a model that can't be loaded is logged and left to load (or fail) on first use.
+        """
+        results = await asyncio.gather(*[
+            cls.ollama_client.generate(model=model, prompt='', keep_alive=LLM_KEEP_ALIVE)
+            for model in LLM_MODELS
+        ], return_exceptions=True)
+        for model, result in zip(LLM_MODELS, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Could not warm up model {model}: {result}")
+
+    async def classify_query(self, query: str) -> Dict[str, Any]:
+        """Classify the user query using CryptoBERT (batched across agents, LRU cached)."""
+        cached = self._classify_cache.get(query)
+        if cached is not None:
+            self._classify_stats["hits"] += 1
+            return cached
+        self._classify_stats["misses"] += 1
+        classification = await classify_batcher.submit(query)
+        self._classify_cache[query] = classification
+        return classification
+
+    @classmethod
+    def cache_info(cls) -> Dict[str, int]:
+        """Return hit/miss counters and current size of the classification cache."""
+        return {**cls._classify_stats, "size": len(cls._classify_cache)}
+
+    @classmethod
+    def llm_cache_info(cls) -> Dict[str, Any]:
+        """Return hit/miss counters and hit ratio of the LLM response cache."""
+        total = cls._llm_stats["hits"] + cls._llm_stats["misses"]
+        return {**cls._llm_stats, "hit_ratio": cls._llm_stats["hits"] / total if total else 0.0}
+
+    async def _generate(self, model: str, prompt: str) -> str:
+        """Generate a completion, reusing a cached one for an identical prompt and model."""
+        key = hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest() + model
+        cached = self._llm_cache.get(key)
+        if cached is not None:
+            self._llm_stats["hits"] += 1
+            return cached
+        self._llm_stats["misses"] += 1
+
+        response = await self.ollama_client.generate(
+            model=model,
+            prompt=prompt,
+            options=LLM_OPTIONS,
+            keep_alive=LLM_KEEP_ALIVE
+        )
+        text = response['response']
+        self._llm_cache.set(key, text, expire=LLM_CACHE_TTL)
+        return text
+
+    def _format_prompt(self, context: List[Dict[str, Any]], classification: Dict[str, Any],
+                       context_str: str = None) -> str:
         """Format context and classification into a prompt for LLMs."""
-        context_str = "\n".join([json.dumps(item, indent=2) for item in context])
+        if context_str is None:
+            context_str = serialize_context(context)
         return f"""User query classification: {classification['label']} (confidence: {classification['score']:.2f})
 
 Relevant context from knowledge graph:
@@ -84,31 +357,21 @@ Relevant context from knowledge graph:
 
 Please provide a comprehensive response integrating information from the context. Be concise but thorough in your analysis."""
 
-    async def generate_response(self, context: List[Dict[str, Any]], classification: Dict[str, Any]) -> str:
+    async def generate_response(self, context: List[Dict[str, Any]], classification: Dict[str, Any],
+                                context_str: str = None) -> str:
         """Generate response using both Qwen 2.5 and DeepSeek R1."""
         if not context:
             return f"No relevant information found for '{classification['label']}'."
 
-        prompt = self._format_prompt(context, classification)
+        prompt = self._format_prompt(context, classification, context_str)
         
         try:
             # Generate responses from both models concurrently
-            qwen_task = self.ollama_client.generate(
-                model='qwen2.5',
-                prompt=prompt,
-                options={'temperature': 0.7, 'max_tokens': 1024}
-            )
-            deepseek_task = self.ollama_client.generate(
-                model='deepseek-r1',
-                prompt=prompt,
-                options={'temperature': 0.7, 'max_tokens': 1024}
-            )
-
-            responses = await asyncio.gather(qwen_task, deepseek_task)
+            responses = await asyncio.gather(*[self._generate(model, prompt) for model in LLM_MODELS])
             
             combined_response = (
-                f"**Qwen 2.5 Analysis**:\n{responses[0]['response']}\n\n"
-                f"**DeepSeek R1 Insights**:\n{responses[1]['response']}"
+                f"**Qwen 2.5 Analysis**:\n{responses[0]}\n\n"
+                f"**DeepSeek R1 Insights**:\n{responses[1]}"
             )
             return combined_response
         except Exception as e:
@@ -119,62 +382,74 @@ Please provide a comprehensive response integrating information from the context
 class FinanceAgent(BaseAgent):
     async def handle_query(self, query: str) -> str:
         """Handle finance-related queries."""
-        classification = self.classify_query(query)
-        context = await asyncio.to_thread(
-            self.graph.fetch_context_for_topic, 
+        classification = await self.classify_query(query)
+        context, context_str = await asyncio.to_thread(
+            self.graph.fetch_context_with_text, 
             topic="finance", 
             limit=5
         )
-        return await self.generate_response(context, classification)
+        return await self.generate_response(context, classification, context_str)
 
 class Web3DevelopmentAgent(BaseAgent):
     async def handle_query(self, query: str) -> str:
         """Handle web3 development-related queries."""
-        classification = self.classify_query(query)
-        context = await asyncio.to_thread(
-            self.graph.fetch_context_for_topic,
+        classification = await self.classify_query(query)
+        context, context_str = await asyncio.to_thread(
+            self.graph.fetch_context_with_text,
             topic="web3",
             limit=5
         )
-        return await self.generate_response(context, classification)
+        return await self.generate_response(context, classification, context_str)
 
 class SustainabilityAgent(BaseAgent):
     async def handle_query(self, query: str) -> str:
         """Handle sustainability-related queries."""
-        classification = self.classify_query(query)
-        context = await asyncio.to_thread(
-            self.graph.fetch_context_for_topic,
+        classification = await self.classify_query(query)
+        context, context_str = await asyncio.to_thread(
+            self.graph.fetch_context_with_text,
             topic="sustainability",
             limit=5
         )
-        return await self.generate_response(context, classification)
+        return await self.generate_response(context, classification, context_str)
 
 class GeneralKnowledgeAgent(BaseAgent):
     async def handle_query(self, query: str) -> str:
         """Handle general knowledge queries."""
-        classification = self.classify_query(query)
-        context = await asyncio.to_thread(
-            self.graph.fetch_context_for_topic,
+        classification = await self.classify_query(query)
+        context, context_str = await asyncio.to_thread(
+            self.graph.fetch_context_with_text,
             topic="general",
             limit=5
         )
-        return await self.generate_response(context, classification)
+        return await self.generate_response(context, classification, context_str)
 
-# Query Router (unchanged)
+# Query Router
 class QueryRouter:
+    # Named group -> agent key, checked in priority order
+    ROUTES = {
+        "finance": ("protocol", "tvl"),
+        "web3_development": ("github", "repository"),
+        "sustainability": ("sustainability", "green"),
+    }
+
     def __init__(self, agents: Dict[str, BaseAgent]):
         self.agents = agents
+        self._pattern = re.compile(
+            "|".join(f"(?P<{key}>{'|'.join(words)})" for key, words in self.ROUTES.items()),
+            re.IGNORECASE
+        )
+
+    def _route_key(self, query: str) -> str:
+        # Scan once, then pick the highest-priority route that matched anywhere
+        matched = {match.lastgroup for match in self._pattern.finditer(query)}
+        for key in self.ROUTES:
+            if key in matched:
+                return key
+        return "general_knowledge"
 
     def route_query(self, query: str) -> List[BaseAgent]:
         """Route the query to the appropriate agent(s)."""
-        if "protocol" in query.lower() or "tvl" in query.lower():
-            return [self.agents["finance"]]
-        elif "github" in query.lower() or "repository" in query.lower():
-            return [self.agents["web3_development"]]
-        elif "sustainability" in query.lower() or "green" in query.lower():
-            return [self.agents["sustainability"]]
-        else:
-            return [self.agents["general_knowledge"]]
+        return [self.agents[self._route_key(query)]]
 
 # Main Workflow
 async def main():
@@ -182,6 +457,10 @@ async def main():
 
     # Initialize Neo4j graph
     graph = Neo4jGraph(driver)
+    await asyncio.gather(
+        asyncio.to_thread(graph.warm_up, ["finance", "web3", "sustainability", "general"], 5),
+        BaseAgent.warm_up_models()
+    )
 
     # Initialize agents
     agents = {
@@ -206,6 +485,10 @@ async def main():
     # Aggregate responses
     final_response = "\n\n".join(responses)
     logger.info(f"Final Response:\n{final_response}")
+    logger.info(f"Classification cache: {BaseAgent.cache_info()}, context cache: {graph.cache_info()}")
+    logger.info(f"LLM response cache: {BaseAgent.llm_cache_info()}")
+
+    graph.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -1,9 +1,11 @@
 import os
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
 
-import praw
-import pandas as pd
+import aiohttp
+import asyncpraw
+import pyarrow as pa
+import pyarrow.parquet as pq
 from dotenv import load_dotenv
 
 # ---------------------------
@@ -14,15 +16,6 @@ REDDIT_CLIENT_ID = os.getenv("REDDIT_CLIENT_ID")
 REDDIT_CLIENT_SECRET = os.getenv("REDDIT_CLIENT_SECRET")
 REDDIT_USER_AGENT = os.getenv("REDDIT_USER_AGENT")
 
-# ---------------------------
-# Reddit API Credentials
-# ---------------------------
-REDDIT = praw.Reddit(
-    client_id=REDDIT_CLIENT_ID,
-    client_secret=REDDIT_CLIENT_SECRET,
-    user_agent=REDDIT_USER_AGENT
-)
-
 # ---------------------------
 # Configuration
 # ---------------------------
@@ -42,59 +35,110 @@ QUERIES = [
 ]
 
 MAX_POSTS = 100  
-MAX_WORKERS = 10  
-CSV_FILENAME = "reddit_scraped_data.csv"
+QUERY_GROUP_SIZE = 8  # Queries OR-ed into one search; cuts 560 searches to 80
+MAX_CONCURRENCY = 64  
+PARQUET_FILENAME = "reddit_scraped_data.parquet"
+FLUSH_ROWS = 10_000
+SCHEMA = pa.schema([
+    ("Subreddit", pa.string()),
+    ("Query", pa.string()),
+    ("Title", pa.string()),
+    ("Text", pa.string()),
+    ("Author", pa.string()),
+    ("Upvotes", pa.int32()),
+    ("Comments", pa.int32()),
+    ("URL", pa.string()),
+    ("Timestamp", pa.timestamp("s")),
+])
+
+QUERY_GROUPS = [tuple(QUERIES[i:i + QUERY_GROUP_SIZE]) for i in range(0, len(QUERIES), QUERY_GROUP_SIZE)]
 
 # ---------------------------
 # Scrape Function
 # ---------------------------
-def scrape_subreddit(subreddit: str, query: str) -> list:
-    """Scrapes a single subreddit with a given query and returns post data as a list of lists."""
-    results = []
+def or_expression(queries: tuple) -> str:
+    """Reddit search expression matching any of the queries (multi-word ones quoted)."""
+    return " OR ".join(f'"{q}"' if " " in q else q for q in queries)
+
+def match_query(text: str, queries: tuple) -> str:
+    """Attributes a post to the first query of its group that it mentions."""
+    lowered = text.lower()
+    return next((q for q in queries if q.lower() in lowered), queries[0])
+
+async def scrape_subreddit(reddit: asyncpraw.Reddit, semaphore: asyncio.Semaphore,
+                           subreddit: str, queries: tuple) -> dict:
+    """Scrapes a single subreddit with one OR search over a query group and returns post data column-wise."""
+    columns = {name: [] for name in SCHEMA.names}
     try:
-        for submission in REDDIT.subreddit(subreddit).search(query, limit=MAX_POSTS):
-            results.append([
-                subreddit,
-                query,
-                submission.title,
-                submission.selftext,
-                submission.author.name if submission.author else "Unknown",
-                submission.score,
-                submission.num_comments,
-                submission.url,
-                time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(submission.created_utc))
-            ])
+        async with semaphore:
+            sub = await reddit.subreddit(subreddit)
+            async for submission in sub.search(or_expression(queries), limit=MAX_POSTS * len(queries)):
+                columns["Subreddit"].append(subreddit)
+                columns["Query"].append(match_query(f"{submission.title} {submission.selftext}", queries))
+                columns["Title"].append(submission.title)
+                columns["Text"].append(submission.selftext)
+                columns["Author"].append(submission.author.name if submission.author else "Unknown")
+                columns["Upvotes"].append(submission.score)
+                columns["Comments"].append(submission.num_comments)
+                columns["URL"].append(submission.url)
+                columns["Timestamp"].append(int(submission.created_utc))
     except Exception as e:
-        print(f"Error scraping r/{subreddit} for '{query}': {e}")
-    return results
+        print(f"Error scraping r/{subreddit} for {queries}: {e}")
+    return columns
 
 # ---------------------------
 # Main Execution
 # ---------------------------
-def main():
-    start_time = time.time()
-    all_data = []
+def write_columns(writer: pq.ParquetWriter, columns: dict):
+    """Writes a window of buffered columns to the Parquet file as one record batch."""
+    writer.write_batch(pa.RecordBatch.from_arrays(
+        [pa.array(columns[field.name], type=field.type) for field in SCHEMA],
+        schema=SCHEMA
+    ))
 
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = []
-        # Submit all jobs
-        for subreddit in SUBREDDITS:
-            for query in QUERIES:
-                futures.append(executor.submit(scrape_subreddit, subreddit, query))
-        
-        # Gather all results as they complete
-        for future in as_completed(futures):
-            all_data.extend(future.result())
+async def scrape_all(writer: pq.ParquetWriter) -> int:
+    """Runs every (subreddit, query group) search concurrently, streaming rows to the writer as they arrive."""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    # Structure-of-arrays buffer: the columns go straight into Arrow, no row-to-column transpose
+    buffer = {name: [] for name in SCHEMA.names}
+    buffered = 0
+    total = 0
+    # One keep-alive connection pool sized to the concurrency limit, shared by every search
+    connector = aiohttp.TCPConnector(limit=MAX_CONCURRENCY, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(connector=connector) as http, asyncpraw.Reddit(
+        client_id=REDDIT_CLIENT_ID,
+        client_secret=REDDIT_CLIENT_SECRET,
+        user_agent=REDDIT_USER_AGENT,
+        requestor_kwargs={"session": http}
+    ) as reddit:
+        tasks = [
+            scrape_subreddit(reddit, semaphore, subreddit, queries)
+            for subreddit in SUBREDDITS for queries in QUERY_GROUPS
+        ]
+        for task in asyncio.as_completed(tasks):
+            columns = await task
+            for name, values in columns.items():
+                buffer[name].extend(values)
+            buffered += len(columns["URL"])
+            if buffered >= FLUSH_ROWS:
+                write_columns(writer, buffer)
+                total += buffered
+                buffer = {name: [] for name in SCHEMA.names}
+                buffered = 0
+    if buffered:
+        write_columns(writer, buffer)
+        total += buffered
+    return total
+
+def main():
+    start_time = time.perf_counter()
 
-    # Create a DataFrame and export to CSV
-    df = pd.DataFrame(all_data, columns=[
-        "Subreddit", "Query", "Title", "Text", "Author",
-        "Upvotes", "Comments", "URL", "Timestamp"
-    ])
-    df.to_csv(CSV_FILENAME, index=False)
+    # Stream batches into a zstd-compressed Parquet file instead of holding every row in memory
+    with pq.ParquetWriter(PARQUET_FILENAME, SCHEMA, compression="zstd") as writer:
+        total = asyncio.run(scrape_all(writer))
 
-    end_time = time.time()
-    print(f"Scraping complete! Data saved to '{CSV_FILENAME}'")
+    end_time = time.perf_counter()
+    print(f"Scraping complete! {total} posts saved to '{PARQUET_FILENAME}'")
     print(f"Total Execution Time: {round(end_time - start_time, 2)} seconds")
 
 if __name__ == "__main__":
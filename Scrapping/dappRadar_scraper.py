@@ -1,36 +1,179 @@
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.driver_finder import DriverFinder
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import WebDriverException
+import os
 import re
 import time
+import functools
+import asyncio
+import queue
+import threading
+import aiohttp
 import requests
-import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+from lxml import etree, html
+from requests.adapters import HTTPAdapter
+from diskcache import Cache
+from dotenv import load_dotenv
+
+load_dotenv()
 
 # Configure Chrome options
 options = Options()
-options.headless = False  
-options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                     "AppleWebKit/537.36 (KHTML, like Gecko) "
-                     "Chrome/113.0.0.0 Safari/537.36")
+options.headless = False
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+              "AppleWebKit/537.36 (KHTML, like Gecko) "
+              "Chrome/113.0.0.0 Safari/537.36")
+options.add_argument(f"user-agent={USER_AGENT}")
+# Only card links are read, so skip image decoding entirely
+options.add_argument("--blink-settings=imagesEnabled=false")
+# Return from get() at DOMContentLoaded instead of waiting for every subresource;
+# the explicit waits below cover the client-rendered cards
+options.page_load_strategy = "eager"
+
+# Requests the scraper never needs: media, fonts and trackers (blocked over CDP)
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.woff", "*.woff2",
+    "*/ads/*", "*doubleclick*", "*googletagmanager*", "*google-analytics*"
+]
+
+BASE_URL = "https://dappradar.com/web3-ecosystem"
+API_BATCH_URL = "http://localhost:8080/api/v1/companies/batch"
+BATCH_SIZE = 500  # Companies per API call; the middleware writes each call as one unordered bulk upsert
+# Browsers for pages that need rendering; each Chrome costs a few hundred MB
+SELENIUM_WORKERS = min(os.cpu_count() or 1, 8)
+DRIVER_MAX_USES = 50  # Recycle a browser after this many pages to bound its memory
+PAGE_ATTEMPTS = 3  # Browser attempts per page before it's given up on
+DRIVER_START_ATTEMPTS = 2  # Chrome launches per pool slot before the slot is dropped
+POOL_ACQUIRE_TIMEOUT = 300  # Seconds a page waits for a free browser
+# Resolved chromedriver path, shared across runs; Selenium Manager is only asked again once a day
+DRIVER_PATH_CACHE = os.path.expanduser("~/.cache/strong_gradient/chromedriver_path")
+DRIVER_PATH_TTL = 24 * 3600
+
+# DappRadar's JSON API serves the same dApp list as the ecosystem page, one
+# HTTP round trip per page and no browser. Used whenever an API key is set;
+# otherwise we fall back to scraping the pages (lxml first, Selenium if needed).
+DAPPRADAR_API_URL = "https://apis.dappradar.com/v2/dapps"
+DAPPRADAR_API_KEY = os.getenv("DAPPRADAR_API_KEY")
+DAPPRADAR_RESULTS_PER_PAGE = 50
+DAPPRADAR_API_CONCURRENCY = 10
+DAPPRADAR_API_ATTEMPTS = 4  # Tries per API page on 429/5xx or a dropped connection
+DAPPRADAR_MAX_BACKOFF = 60  # Seconds; cap on any single wait, Retry-After included
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Card URLs per page survive reruns for 15 minutes (same on-disk cache as the pipeline),
+# so a restarted scrape skips the pages it already fetched or rendered
+page_cache = Cache(os.getenv(
+    "SCRAPER_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".scraper_cache")
+))
+PAGE_CACHE_TTL = 900
+
+# Persistent keep-alive session for the company API; pushes run in the background
+# so the next page load isn't blocked waiting for the API.
+session = requests.Session()
+session.headers.update({'Content-Type': 'application/json'})
+push_executor = ThreadPoolExecutor(max_workers=4)
+push_futures = []
+PUSH_TIMEOUT = 30  # Seconds per API call, so a stalled request can't pin a push worker
+
+# Plain HTTP session for the ecosystem pages: when the server-rendered HTML already
+# holds the cards we parse it with lxml and never start a browser.
+page_session = requests.Session()
+page_session.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=32))
+page_session.headers.update({"User-Agent": USER_AGENT})
+# Browser-side CSS selectors, defined once for every page and driver
+PAGINATION_SELECTOR = (
+    "#root > div.App.lang-en > div.sc-dmjyfX.lavnNz.Container.sc-fNYidB.lmTbCu > section > "
+    "div.sc-iySxkz.hfIPwu > div.sc-dmBZcA.sc-dxBvky.bvcmCI.enyxzJ > "
+    "div.sc-gikAfH.gfPAvV.pagination-selector > div > a:last-child"
+)
+CARD_SELECTOR = (
+    "#root > div.App.lang-en > div.sc-dmjyfX.lavnNz.Container.sc-fNYidB.lmTbCu > section > "
+    "div.sc-iySxkz.hfIPwu > div.sc-gNghfG.dvYAwN > div > a"
+)
+
+
+def child_selector_xpath(selector):
+    """
+    XPath for a CSS selector made of '>'-joined tag#id.class steps (optionally
+    :last-child), so lxml matches exactly the elements the browser does.
+    """
+    steps = []
+    for step in selector.split(">"):
+        step = step.strip()
+        last_child = step.endswith(":last-child")
+        if last_child:
+            step = step[:-len(":last-child")]
+        tag, *classes = step.split(".")
+        tag, _, element_id = tag.partition("#")
+        if last_child:
+            xpath = "*[last()]" + (f"[self::{tag}]" if tag else "")
+        else:
+            xpath = tag or "*"
+        if element_id:
+            xpath += f"[@id='{element_id}']"
+        xpath += "".join(f"[contains(concat(' ', normalize-space(@class), ' '), ' {c} ')]" for c in classes)
+        steps.append(xpath)
+    return "//" + "/".join(steps)
 
-driver = webdriver.Chrome(options=options)
+
+# Static-HTML equivalents of the selectors above, compiled once
+PAGINATION_XP = etree.XPath(f"normalize-space({child_selector_xpath(PAGINATION_SELECTOR)})")
+CARD_LINKS_XP = etree.XPath(f"{child_selector_xpath(CARD_SELECTOR)}/@href")
+PAGE_COUNT_RE = re.compile(r"\d+")
+
+
+@functools.lru_cache(maxsize=1)
+def driver_path():
+    """
+    chromedriver path: CHROMEDRIVER_PATH if set, else the cached resolution if it is
+    less than a day old, else ask Selenium Manager (which may hit the network) and cache it.
+    """
+    path = os.getenv("CHROMEDRIVER_PATH")
+    if path:
+        return path
+    try:
+        if time.time() - os.path.getmtime(DRIVER_PATH_CACHE) < DRIVER_PATH_TTL:
+            with open(DRIVER_PATH_CACHE) as f:
+                path = f.read().strip()
+            if os.path.isfile(path):
+                return path
+    except OSError:
+        pass
+
+    path = DriverFinder(Service(), options).get_driver_path()
+    os.makedirs(os.path.dirname(DRIVER_PATH_CACHE), exist_ok=True)
+    with open(DRIVER_PATH_CACHE, "w") as f:
+        f.write(path)
+    return path
+
+
+def new_driver():
+    """Chrome with a persistent keep-alive connection to chromedriver for every command."""
+    driver = webdriver.Chrome(service=Service(driver_path()), options=options, keep_alive=True)
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+    except WebDriverException:
+        driver.quit()
+        raise
+    return driver
 
 
 def extract_pagination_integer(driver, timeout=20):
-    selector = (
-        "#root > div.App.lang-en > div.sc-dmjyfX.lavnNz.Container.sc-fNYidB.lmTbCu > section > "
-        "div.sc-iySxkz.hfIPwu > div.sc-dmBZcA.sc-dxBvky.bvcmCI.enyxzJ > "
-        "div.sc-gikAfH.gfPAvV.pagination-selector > div > a:last-child"
-    )
     element = WebDriverWait(driver, timeout).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+        EC.presence_of_element_located((By.CSS_SELECTOR, PAGINATION_SELECTOR))
     )
-    text = element.text
+    # outerHTML is a plain string copy; element.text makes Chrome lay out the visible text
+    text = html.fragment_fromstring(driver.execute_script("return arguments[0].outerHTML;", element)).text_content()
     print(f"Extracted pagination text: '{text}'")
-    match = re.search(r'\d+', text)
+    match = PAGE_COUNT_RE.search(text)
     return int(match.group()) if match else None
 
 
@@ -38,61 +181,314 @@ def push_data_to_api(companies):
     """Push collected company data to the API."""
     if not companies:
         return  # Avoid pushing empty data
-    
-    url = "http://localhost:8080/api/v1/companies/batch"
-    payload = json.dumps({"companies": companies})
-    headers = {'Content-Type': 'application/json'}
-    response = requests.post(url, data=payload, headers=headers)
+
+    response = session.post(API_BATCH_URL, json={"companies": companies}, timeout=PUSH_TIMEOUT)
     print(f"API Response: {response.status_code}, {response.text}")
+    response.raise_for_status()
+
+
+def submit_push(companies):
+    """Push a batch in the background; wait_for_pushes() reports how it went."""
+    push_futures.append(push_executor.submit(push_data_to_api, companies))
+
+
+def wait_for_pushes():
+    """Wait for every queued push and raise if any batch didn't reach the API."""
+    failed = 0
+    for future in push_futures:
+        error = future.exception()
+        if error is not None:
+            failed += 1
+            print(f"Batch push failed: {error}")
+    if failed:
+        raise RuntimeError(f"{failed} of {len(push_futures)} company batches failed to push")
+
+
+def company_name_from_url(url):
+    """Derive the company name from a dApp page URL (last path segment)."""
+    return url.rstrip('/').split('/')[-1].replace("-", " ")
+
+
+async def fetch_api_page(http, semaphore, page):
+    """
+    Fetch one page of dApps from the DappRadar API, retrying 429/5xx and connection
+    errors with exponential backoff (or as long as Retry-After asks).
+    """
+    params = {"page": page, "resultsPerPage": DAPPRADAR_RESULTS_PER_PAGE}
+    for attempt in range(1, DAPPRADAR_API_ATTEMPTS + 1):
+        delay = 2 ** (attempt - 1)
+        try:
+            async with semaphore:
+                async with http.get(DAPPRADAR_API_URL, params=params) as response:
+                    if response.status not in RETRY_STATUSES or attempt == DAPPRADAR_API_ATTEMPTS:
+                        response.raise_for_status()
+                        return await response.json()
+                    if response.headers.get("Retry-After", "").isdigit():
+                        delay = int(response.headers["Retry-After"])
+                    print(f"API page {page} answered {response.status} (attempt {attempt}/{DAPPRADAR_API_ATTEMPTS})")
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            if attempt == DAPPRADAR_API_ATTEMPTS:
+                raise
+            print(f"API page {page} failed (attempt {attempt}/{DAPPRADAR_API_ATTEMPTS}): {e}")
+        # Sleep outside the semaphore so other pages keep going
+        await asyncio.sleep(min(delay, DAPPRADAR_MAX_BACKOFF))
+
+
+async def scrape_with_api():
+    """Collect every dApp name through the DappRadar API and push them in batches."""
+    semaphore = asyncio.Semaphore(DAPPRADAR_API_CONCURRENCY)
+    headers = {"X-API-KEY": DAPPRADAR_API_KEY}
+    async with aiohttp.ClientSession(headers=headers) as http:
+        first_page = await fetch_api_page(http, semaphore, 1)
+        page_count = first_page.get("pageCount", 1)
+        print(f"Pagination integer: {page_count}")
+        other_pages = await asyncio.gather(
+            *[fetch_api_page(http, semaphore, page) for page in range(2, page_count + 1)],
+            return_exceptions=True
+        )
+
+    companies = []
+    missing_pages = []
+    for page, data in enumerate([first_page, *other_pages], start=1):
+        if isinstance(data, Exception):
+            print(f"Error fetching API page {page}: {data}")
+            missing_pages.append(page)
+            continue
+        for dapp in data.get("results", []):
+            # Same naming as the Selenium path: the slug of the dApp's DappRadar page
+            company_name = company_name_from_url(dapp["link"]) if dapp.get("link") else dapp.get("name")
+            if company_name:
+                companies.append({"name": company_name, "status": "not activated"})
+                if len(companies) >= BATCH_SIZE:
+                    submit_push(companies)
+                    companies = []
+
+    if companies:
+        submit_push(companies)
+    # What was fetched is still pushed, but a partial run must not look like a complete one
+    if missing_pages:
+        raise RuntimeError(f"{len(missing_pages)} of {page_count} API pages could not be fetched: {missing_pages}")
+
+
+def fetch_static_page(url):
+    """Fetch a page without a browser; None if the request fails."""
+    try:
+        response = page_session.get(url, timeout=10)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print(f"Static fetch failed for {url}: {e}")
+        return None
+    return html.fromstring(response.content)
 
 
-try:
-    base_url = "https://dappradar.com/web3-ecosystem"
-    driver.get(base_url)
-    time.sleep(5)
-    
-    page_number = extract_pagination_integer(driver)
+def static_page_count(tree):
+    """Pagination integer from server-rendered HTML, or None if it isn't there."""
+    match = PAGE_COUNT_RE.search(PAGINATION_XP(tree)) if tree is not None else None
+    return int(match.group()) if match else None
+
+
+def static_card_urls(tree):
+    """dApp page URLs from server-rendered HTML (empty if the cards are rendered client-side)."""
+    if tree is None:
+        return []
+    return [urljoin(BASE_URL, href) for href in dict.fromkeys(CARD_LINKS_XP(tree))]
+
+
+def selenium_card_urls(driver, page_url):
+    """Load a page in the browser and read every card's href."""
+    driver.get(page_url)
+    # Wait for the cards themselves, not for the full load event
+    WebDriverWait(driver, 30).until(
+        EC.presence_of_all_elements_located((By.CSS_SELECTOR, CARD_SELECTOR))
+    )
+    # One script round trip for every href instead of a get_attribute call per card
+    hrefs = driver.execute_script(
+        "return Array.from(document.querySelectorAll(arguments[0]), a => a.getAttribute('href') && a.href);",
+        CARD_SELECTOR
+    )
+    print(f"Found {len(hrefs)} cards on {page_url}.")
+
+    urls = []
+    for idx, url in enumerate(hrefs, start=1):
+        if url:
+            urls.append(url)
+        else:
+            print(f"Card {idx} does not have a valid href attribute.")
+    return urls
+
+
+class BrowserPoolExhausted(RuntimeError):
+    """No browser could be handed out: every slot was lost or none freed up in time."""
+
+
+class BrowserPool:
+    """
+    Pre-warmed Chrome drivers handed out one per page. Each thread holds a driver
+    exclusively between acquire() and release(); a driver is replaced after
+    DRIVER_MAX_USES pages, or straight away if its page failed. A slot whose
+    replacement Chrome won't start is dropped, and acquire() fails fast once
+    no slots are left.
+    """
+
+    def __init__(self, size):
+        self._drivers = queue.Queue()
+        self._uses = {}
+        self._lock = threading.Lock()
+        self._capacity = size  # Slots holding a driver, checked out or idle
+        for _ in range(size):
+            self._refill()
+
+    def _refill(self):
+        """Start a driver for a free slot; False if Chrome won't start and the slot was dropped."""
+        for attempt in range(1, DRIVER_START_ATTEMPTS + 1):
+            try:
+                driver = new_driver()
+            except (WebDriverException, OSError) as e:
+                print(f"Could not start Chrome (attempt {attempt}/{DRIVER_START_ATTEMPTS}): {e}")
+                continue
+            with self._lock:
+                self._uses[driver] = 0
+            self._drivers.put(driver)
+            return True
+
+        with self._lock:
+            self._capacity -= 1
+            print(f"Dropped a browser slot, {self._capacity} left")
+        return False
+
+    def acquire(self, timeout=POOL_ACQUIRE_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        while True:
+            if self._capacity <= 0:
+                raise BrowserPoolExhausted("No browsers left in the pool")
+            try:
+                # Short waits so threads notice the pool emptying instead of blocking forever
+                return self._drivers.get(timeout=1)
+            except queue.Empty:
+                if time.monotonic() >= deadline:
+                    raise BrowserPoolExhausted(f"No browser freed up within {timeout} s")
+
+    def release(self, driver, broken=False):
+        """Hand a driver back; False if it had to be replaced and the replacement failed."""
+        with self._lock:
+            self._uses[driver] += 1
+            retire = broken or self._uses[driver] >= DRIVER_MAX_USES
+            if retire:
+                del self._uses[driver]
+        if not retire:
+            self._drivers.put(driver)
+            return True
+
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+        return self._refill()
+
+    def close(self):
+        """Quit every idle driver; one that fails to quit doesn't stop the rest."""
+        while not self._drivers.empty():
+            driver = self._drivers.get_nowait()
+            try:
+                driver.quit()
+            except (WebDriverException, OSError) as e:
+                print(f"Error quitting a pooled browser: {e}")
+
+
+def scrape_with_pool(pool, page_url):
+    """Scrape one page on a pooled browser, retrying with backoff on a fresh browser."""
+    for attempt in range(1, PAGE_ATTEMPTS + 1):
+        try:
+            driver = pool.acquire()
+        except BrowserPoolExhausted as e:
+            print(f"Giving up on {page_url}: {e}")
+            return []
+        urls = None
+        try:
+            urls = selenium_card_urls(driver, page_url)
+        except WebDriverException as e:  # TimeoutException included
+            print(f"Error scraping {page_url} in browser (attempt {attempt}/{PAGE_ATTEMPTS}): {e}")
+        finally:
+            # Anything short of a clean scrape retires the browser rather than retrying on it.
+            # release() doesn't raise: a replacement that won't start just shrinks the pool.
+            replaced = pool.release(driver, broken=urls is None)
+        if urls is not None:
+            return urls
+        if not replaced:
+            print(f"No replacement browser after attempt {attempt} on {page_url}")
+        if attempt < PAGE_ATTEMPTS:
+            time.sleep(2 ** (attempt - 1))
+    return []
+
+
+def scrape_pages():
+    """
+    Scrape the ecosystem pages, parsing the server-rendered HTML with lxml and
+    rendering only the pages whose cards aren't in that HTML on a pool of browsers.
+    """
+    page_number = static_page_count(fetch_static_page(BASE_URL))
+    if page_number is None:
+        driver = new_driver()
+        try:
+            # extract_pagination_integer waits for the pagination element itself
+            driver.get(BASE_URL)
+            page_number = extract_pagination_integer(driver)
+        finally:
+            driver.quit()
     print(f"Pagination integer: {page_number}")
-    
+
     companies = []
-    batch_size = 25
-    
+
+    def collect(urls):
+        nonlocal companies
+        for url in urls:
+            companies.append({"name": company_name_from_url(url), "status": "not activated"})
+
+            # Push data every BATCH_SIZE companies
+            if len(companies) >= BATCH_SIZE:
+                submit_push(companies)
+                companies = []  # Clear list after pushing
+
+    needs_browser = []
     for i in range(1, page_number + 1):
-        page_url = f"{base_url}/{i}"
+        page_url = f"{BASE_URL}/{i}"
         print(f"\nProcessing page: {page_url}")
-        driver.get(page_url)
-        WebDriverWait(driver, 30).until(lambda d: d.execute_script("return document.readyState") == "complete")
-        time.sleep(5)
-        
-        cards = WebDriverWait(driver, 30).until(
-            EC.presence_of_all_elements_located(
-                (By.CSS_SELECTOR,
-                 "#root > div.App.lang-en > div.sc-dmjyfX.lavnNz.Container.sc-fNYidB.lmTbCu > section > "
-                 "div.sc-iySxkz.hfIPwu > div.sc-gNghfG.dvYAwN > div > a")
-            )
-        )
-        print(f"Found {len(cards)} cards on page {i}.")
-        
-        for idx, card in enumerate(cards, start=1):
-            try:
-                url = card.get_attribute("href")
-                if url:
-                    company_name = url.split('/')[-1].replace("-", " ")
-                    companies.append({"name": company_name, "status": "not activated"})
-                    
-                    # Push data every 25 companies
-                    if len(companies) >= batch_size:
-                        push_data_to_api(companies)
-                        companies = []  # Clear list after pushing
-                    
-                else:
-                    print(f"Card {idx} does not have a valid href attribute.")
-            except Exception as e:
-                print(f"Error extracting company name for card {idx}: {e}")
+        urls = page_cache.get(("dappradar_page", page_url))
+        if urls is None:
+            urls = static_card_urls(fetch_static_page(page_url))
+            if urls:
+                page_cache.set(("dappradar_page", page_url), urls, expire=PAGE_CACHE_TTL)
+        if urls:
+            collect(urls)
+        else:
+            needs_browser.append(page_url)
+
+    if needs_browser:
+        workers = min(SELENIUM_WORKERS, len(needs_browser))
+        pool = BrowserPool(size=workers)
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(lambda url: scrape_with_pool(pool, url), needs_browser)
+                for page_url, urls in zip(needs_browser, results):
+                    if urls:
+                        page_cache.set(("dappradar_page", page_url), urls, expire=PAGE_CACHE_TTL)
+                    collect(urls)
+        finally:
+            pool.close()
 
     # Final push if any remaining companies exist
     if companies:
-        push_data_to_api(companies)
+        submit_push(companies)
+
 
-finally:
-    driver.quit()
+if __name__ == "__main__":
+    try:
+        if DAPPRADAR_API_KEY:
+            asyncio.run(scrape_with_api())
+        else:
+            scrape_pages()
+    finally:
+        try:
+            wait_for_pushes()
+        finally:
+            push_executor.shutdown(wait=True)
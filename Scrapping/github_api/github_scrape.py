@@ -3,9 +3,16 @@ import asyncio
 import json
 import time
 import base64
-from aiohttp import ClientSession
+import functools
+import heapq
+import re
+import zlib
+import numpy as np
+from aiohttp import ClientSession, web
+from urllib.parse import urlencode
+from concurrent.futures import ProcessPoolExecutor
+from diskcache import Cache
 import os
-from flask import Flask, jsonify, request
 from dotenv import load_dotenv
 load_dotenv()
 # Define Web3 and sustainability-related keywords for filtering
@@ -16,6 +23,23 @@ SUSTAINABILITY_KEYWORDS = ['sustainability', 'energy', 'carbon', 'environment',
 GITHUB_API_URL = 'https://api.github.com/search/repositories'
 GITHUB_CONTENTS_API_URL = 'https://api.github.com/repos/{owner}/{repo}/contents/README.md'
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")  
+MAX_PAGES = 2  # Search pages fetched per keyword; the search API allows 30 requests a minute
+SEARCH_CONCURRENCY = 5  # Concurrent search requests
+MAX_ATTEMPTS = 3  # Tries per GitHub request on 429/5xx or an exhausted rate limit
+MAX_RATE_LIMIT_SLEEP = 60  # Seconds; longer waits give up on the request instead
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+README_CONCURRENCY = 20  # Concurrent README downloads
+GITHUB_CACHE_DIR = os.getenv("GITHUB_CACHE_DIR", "/tmp/gh_cache")
+ETAG_CACHE_TTL = 7 * 24 * 3600  # Drop entries not revalidated for a week
+
+# ETag -> parsed body cache shared across requests and processes; a 304 doesn't count against the rate limit
+etag_cache = Cache(GITHUB_CACHE_DIR)
+
+# Processes per server worker for README scoring, created at app startup; kept small
+# because every gunicorn worker gets its own pool
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", "2"))
+# base64 decoding is C-speed: inline for typical READMEs, a thread for very large ones
+README_INLINE_DECODE_BYTES = 256 * 1024
 # Updated Web3 Best Practices Document with essential keywords
 WEB3_BEST_PRACTICE_DOC = """
 web3, ethereum, blockchain, decentralization, smart contract, defi, dapp, dao, ipfs, zkp, polkadot, cosmos, cryptography, trustless, transparency
@@ -26,19 +50,41 @@ SUSTAINABILITY_BEST_PRACTICE_DOC = """
 sustainability, blockchain, proof-of-stake, energy efficiency, carbon offset, renewable energy, low-carbon, eco-friendly, decentralized governance, energy consumption, carbon footprint
 """
 
-# Function to compute Jaccard Similarity (set-based comparison)
-def jaccard_similarity(str1, str2):
-    set1 = set(str1.lower().split())
-    set2 = set(str2.lower().split())
-    intersection = set1.intersection(set2)
-    union = set1.union(set2)
-    return len(intersection) / len(union) if union else 0
+# Hashed-token bitmaps: each token sets one of BITMAP_BITS bits, so Jaccard becomes popcount(a & b) / popcount(a | b)
+BITMAP_BITS = 4096
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+def token_bitmap(tokens):
+    bitmap = np.zeros(BITMAP_BITS // 64, dtype=np.uint64)
+    if tokens:
+        bits = np.fromiter((zlib.crc32(token.encode()) % BITMAP_BITS for token in set(tokens)), dtype=np.uint64)
+        np.bitwise_or.at(bitmap, bits >> np.uint64(6), np.left_shift(np.uint64(1), bits & np.uint64(63)))
+    return bitmap
+
+def bitmap_jaccard(bitmap1, bitmap2):
+    union = int(np.bitwise_count(bitmap1 | bitmap2).sum())
+    return int(np.bitwise_count(bitmap1 & bitmap2).sum()) / union if union else 0
+
+# Reference documents are fixed, so tokenize and hash them once at import
+WEB3_REF = frozenset(tokenize(WEB3_BEST_PRACTICE_DOC))
+SUSTAINABILITY_REF = frozenset(tokenize(SUSTAINABILITY_BEST_PRACTICE_DOC))
+WEB3_REF_BITMAP = token_bitmap(WEB3_REF)
+SUSTAINABILITY_REF_BITMAP = token_bitmap(SUSTAINABILITY_REF)
+
+# Forks and template READMEs repeat the same text; each pool worker remembers recent scores.
+# Keyed on the text itself (str hashes are cached) so a hash collision can't return wrong scores
+@functools.lru_cache(maxsize=4096)
+def _scores(readme_text):
+    # Tokenize the README once and compare its bitmap against both reference bitmaps
+    readme_bitmap = token_bitmap(tokenize(readme_text))
+    return bitmap_jaccard(readme_bitmap, WEB3_REF_BITMAP), bitmap_jaccard(readme_bitmap, SUSTAINABILITY_REF_BITMAP)
 
 # Calculate the relevance score for Web3 and Sustainability Best Practices
 def calculate_score_from_text(readme_text):
-    # Compute Jaccard similarity for Web3 and Sustainability relevance
-    web3_score = jaccard_similarity(readme_text, WEB3_BEST_PRACTICE_DOC)
-    sustainability_score = jaccard_similarity(readme_text, SUSTAINABILITY_BEST_PRACTICE_DOC)
+    web3_score, sustainability_score = _scores(readme_text)
     return {
         'web3_relevance': web3_score,
         'sustainability_relevance': sustainability_score
@@ -58,6 +104,58 @@ def calculate_sustainability_score(repository):
 def normalize_scores(scores, max_scores):
     return {key: score / max_scores.get(key, 1) for key, score in scores.items()}
 
+def rate_limit_delay(headers):
+    """Seconds GitHub asks us to wait, via Retry-After or an exhausted X-RateLimit window (0 if none)."""
+    if headers.get('Retry-After', '').isdigit():
+        return float(headers['Retry-After'])
+    if headers.get('X-RateLimit-Remaining') == '0' and headers.get('X-RateLimit-Reset', '').isdigit():
+        return max(float(headers['X-RateLimit-Reset']) - time.time(), 1)
+    return 0
+
+# Conditional GET: send the stored ETag and serve the cached body when GitHub answers 304 Not Modified.
+# 429/5xx and rate-limited 403s are retried, waiting as long as GitHub asks (or backing off).
+async def conditional_get(session: ClientSession, url: str, headers: dict, parse, params: dict = None):
+    key = f"{url}?{urlencode(sorted(params.items()))}" if params else url
+    cached = etag_cache.get(key)
+    if cached:
+        headers = {**headers, 'If-None-Match': cached[0]}
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        async with session.get(url, params=params, headers=headers) as response:
+            if response.status == 304 and cached:
+                return response.status, cached[1]
+            if response.status == 200:
+                body = await parse(response)
+                etag = response.headers.get('ETag')
+                if etag:
+                    etag_cache.set(key, (etag, body), expire=ETAG_CACHE_TTL)
+                return response.status, body
+            status = response.status
+            delay = rate_limit_delay(response.headers)
+        # A 403 is only worth retrying when it is a rate limit
+        if status not in RETRY_STATUSES and not (status == 403 and delay):
+            return status, None
+        delay = delay or 2 ** (attempt - 1)
+        if attempt == MAX_ATTEMPTS or delay > MAX_RATE_LIMIT_SLEEP:
+            return status, None
+        print(f"GitHub answered {status} for {url}, retrying in {delay:.0f}s")
+        await asyncio.sleep(delay)
+
+async def parse_search_items(response):
+    data = await response.json()
+    return data['items']
+
+def decode_readme(readme_content):
+    return base64.b64decode(readme_content).decode('utf-8')
+
+async def parse_readme(response):
+    content = await response.json()
+    # Decode the base64-encoded content once; the cache stores the markdown
+    readme_content = content.get('content', '')
+    if len(readme_content) > README_INLINE_DECODE_BYTES:
+        return await asyncio.to_thread(decode_readme, readme_content)
+    return decode_readme(readme_content)
+
 # Asynchronous function to get repositories from GitHub based on the Web3 keywords
 async def fetch_repositories(session: ClientSession, keyword: str, page: int):
     params = {
@@ -70,130 +168,170 @@ async def fetch_repositories(session: ClientSession, keyword: str, page: int):
 
     headers = {'Authorization': f'token {GITHUB_TOKEN}'}
     
-    async with session.get(GITHUB_API_URL, params=params, headers=headers) as response:
-        if response.status == 200:
-            data = await response.json()
-            return data['items']
-        else:
-            print(f"Error fetching data for {keyword}: {response.status}")
-            return []
+    status, items = await conditional_get(session, GITHUB_API_URL, headers, parse_search_items, params=params)
+    if items is None:
+        print(f"Error fetching data for {keyword}: {status}")
+        return []
+    return items
 
 # Asynchronous function to fetch the README content (markdown)
 async def fetch_readme(session: ClientSession, owner: str, repo: str):
     url = GITHUB_CONTENTS_API_URL.format(owner=owner, repo=repo)
     headers = {'Authorization': f'token {GITHUB_TOKEN}'}
     
-    async with session.get(url, headers=headers) as response:
-        if response.status == 200:
-            content = await response.json()
-            # Decode the base64-encoded content and return as markdown
-            readme_content = content.get('content', '')
-            decoded_readme = base64.b64decode(readme_content).decode('utf-8')
-            return decoded_readme
-        else:
-            print(f"Error fetching README for {owner}/{repo}: {response.status}")
-            return None
-
-# Function to process and score repositories
-async def process_repositories(keywords, requester_id):
-    async with aiohttp.ClientSession() as session:
-        # Manage the state of fetched repositories
-        seen_repositories = set()  # Track repositories that have already been fetched
-        page = 1  # Start from the first page
-        repositories_with_scores = []
-
-        while True:
-            # Fetch repositories for each Web3-related keyword
-            tasks = [fetch_repositories(session, keyword, page) for keyword in keywords]
-            results = await asyncio.gather(*tasks)
-
-            # Flatten the results and calculate scores
-            max_scores = {
-                'web3_relevance': 0,
-                'sustainability_relevance': 0,
-                'score': 0
-            }
-
-            # Calculate scores and track max values for normalization
-            for keyword, repos in zip(keywords, results):
-                for repo in repos:
-                    if repo['id'] not in seen_repositories:  # Ensure we haven't seen this repo before
-                        seen_repositories.add(repo['id'])
-                        score = calculate_sustainability_score(repo)
-                        owner = repo['owner']['login']
-                        repo_name = repo['name']
-                        
-                        # Fetch README markdown content
-                        readme_content = await fetch_readme(session, owner, repo_name)
-                        
-                        # Calculate relevance scores for Web3 and Sustainability
-                        readme_scores = calculate_score_from_text(readme_content) if readme_content else {
-                            'web3_relevance': 0, 'sustainability_relevance': 0
-                        }
-
-                        # Update max scores for normalization
-                        max_scores['web3_relevance'] = max(max_scores['web3_relevance'], readme_scores['web3_relevance'])
-                        max_scores['sustainability_relevance'] = max(max_scores['sustainability_relevance'], readme_scores['sustainability_relevance'])
-                        max_scores['score'] = max(max_scores['score'], score)
-
-                        # Append repository with normalized scores
-                        repositories_with_scores.append({
-                            'repository_name': repo['full_name'],
-                            'score': score,
-                            'description': repo.get('description', 'No description'),
-                            'url': repo['html_url'],
-                            'stars': repo['stargazers_count'],
-                            'forks': repo['forks_count'],
-                            'issues': repo['open_issues_count'],
-                            'web3_relevance': readme_scores['web3_relevance'],
-                            'sustainability_relevance': readme_scores['sustainability_relevance']
-                        })
-
-            # Check if we fetched fewer than 100 results; if so, stop fetching
-            if len(repositories_with_scores) < 100:
-                break
-
-            page += 1  # Increment to the next page
-        
-        # Normalize all scores
-        normalized_repositories = []
-        for repo in repositories_with_scores:
-            normalized_repo = repo.copy()
-            normalized_repo['web3_relevance'] = normalized_repo['web3_relevance'] / max_scores['web3_relevance']
-            normalized_repo['sustainability_relevance'] = normalized_repo['sustainability_relevance'] / max_scores['sustainability_relevance']
-            normalized_repo['score'] = normalized_repo['score'] / max_scores['score']
-            normalized_repositories.append(normalized_repo)
-
-        # Filter repositories that are relevant enough (e.g., Web3 or Sustainability relevance > 0.01)
-        relevant_repositories = [repo for repo in normalized_repositories if repo['web3_relevance'] > 0.01 or repo['sustainability_relevance'] > 0.01]
-
-        # Sort repositories by total score (sustainability score + relevance scores)
-        relevant_repositories.sort(key=lambda x: (x['score'] + x['web3_relevance'] + x['sustainability_relevance']), reverse=True)
-        return relevant_repositories[:100]  # Return top 100 repositories
-
-# Flask API setup
-app = Flask(__name__)
+    status, readme = await conditional_get(session, url, headers, parse_readme)
+    if readme is None:
+        print(f"Error fetching README for {owner}/{repo}: {status}")
+    return readme
+
+# Function to process and score repositories using the shared GitHub session
+async def process_repositories(session: ClientSession, cpu_pool: ProcessPoolExecutor, keywords, requester_id):
+    # Manage the state of fetched repositories
+    seen_repositories = set()  # Track repositories that have already been fetched
+    readme_semaphore = asyncio.Semaphore(README_CONCURRENCY)  # Stay under GitHub's secondary rate limit
+    search_semaphore = asyncio.Semaphore(SEARCH_CONCURRENCY)
+    repositories_with_scores = []
+    max_scores = {
+        'web3_relevance': 0,
+        'sustainability_relevance': 0,
+        'score': 0
+    }
+
+    loop = asyncio.get_running_loop()
+
+    async def no_readme_scores():
+        return {'web3_relevance': 0, 'sustainability_relevance': 0}
+
+    async def fetch_repositories_limited(keyword, page):
+        async with search_semaphore:
+            return await fetch_repositories(session, keyword, page)
+
+    async def fetch_readme_limited(owner, repo_name):
+        async with readme_semaphore:
+            return await fetch_readme(session, owner, repo_name)
+
+    for page in range(1, MAX_PAGES + 1):
+        # Fetch repositories for each Web3-related keyword
+        tasks = [fetch_repositories_limited(keyword, page) for keyword in keywords]
+        results = await asyncio.gather(*tasks)
+
+        # Collect the repositories we haven't seen before
+        pending = []
+        for repos in results:
+            for repo in repos:
+                if repo['id'] not in seen_repositories:
+                    seen_repositories.add(repo['id'])
+                    pending.append(repo)
+
+        # No new repositories on this page, so later pages won't add anything either
+        if not pending:
+            break
+
+        # Fetch every README markdown for this page concurrently
+        readmes = await asyncio.gather(
+            *[fetch_readme_limited(repo['owner']['login'], repo['name']) for repo in pending],
+            return_exceptions=True
+        )
+
+        # Calculate relevance scores for Web3 and Sustainability in the CPU pool
+        score_tasks = []
+        for repo, readme_content in zip(pending, readmes):
+            if isinstance(readme_content, Exception):
+                print(f"Error fetching README for {repo['full_name']}: {readme_content}")
+                readme_content = None
+            score_tasks.append(
+                loop.run_in_executor(cpu_pool, calculate_score_from_text, readme_content) if readme_content
+                else no_readme_scores()
+            )
+        readme_scores_list = await asyncio.gather(*score_tasks)
+
+        # Calculate scores and track max values for normalization
+        for repo, readme_scores in zip(pending, readme_scores_list):
+            score = calculate_sustainability_score(repo)
+
+            # Update max scores for normalization
+            max_scores['web3_relevance'] = max(max_scores['web3_relevance'], readme_scores['web3_relevance'])
+            max_scores['sustainability_relevance'] = max(max_scores['sustainability_relevance'], readme_scores['sustainability_relevance'])
+            max_scores['score'] = max(max_scores['score'], score)
+
+            # Append repository with normalized scores
+            repositories_with_scores.append({
+                'repository_name': repo['full_name'],
+                'score': score,
+                'description': repo.get('description', 'No description'),
+                'url': repo['html_url'],
+                'stars': repo['stargazers_count'],
+                'forks': repo['forks_count'],
+                'issues': repo['open_issues_count'],
+                'web3_relevance': readme_scores['web3_relevance'],
+                'sustainability_relevance': readme_scores['sustainability_relevance']
+            })
+
+    # Normalize all scores; the maxima were tracked in the scoring loop above, and the
+    # floor keeps a page where every README scored 0 from dividing by zero
+    max_web3 = max(max_scores['web3_relevance'], 1e-9)
+    max_sustainability = max(max_scores['sustainability_relevance'], 1e-9)
+    max_score = max(max_scores['score'], 1e-9)
+    normalized_repositories = []
+    for repo in repositories_with_scores:
+        normalized_repo = repo.copy()
+        normalized_repo['web3_relevance'] = normalized_repo['web3_relevance'] / max_web3
+        normalized_repo['sustainability_relevance'] = normalized_repo['sustainability_relevance'] / max_sustainability
+        normalized_repo['score'] = normalized_repo['score'] / max_score
+        normalized_repositories.append(normalized_repo)
+
+    # Filter repositories that are relevant enough (e.g., Web3 or Sustainability relevance > 0.01)
+    relevant_repositories = [repo for repo in normalized_repositories if repo['web3_relevance'] > 0.01 or repo['sustainability_relevance'] > 0.01]
+
+    # Top 100 repositories by total score (sustainability score + relevance scores), without sorting the rest
+    return heapq.nlargest(100, relevant_repositories,
+                          key=lambda x: x['score'] + x['web3_relevance'] + x['sustainability_relevance'])
+
+# Web API setup
+async def create_github_session(app: web.Application):
+    # One keep-alive connection pool for the life of the server instead of a TLS handshake per request
+    app['gh_session'] = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=100, keepalive_timeout=60, ttl_dns_cache=300),
+        timeout=aiohttp.ClientTimeout(total=30)
+    )
+
+async def close_github_session(app: web.Application):
+    await app['gh_session'].close()
+
+async def create_scoring_pool(app: web.Application):
+    # Jaccard scoring is CPU-bound, so it runs in processes and the event loop keeps serving HTTP
+    app['cpu_pool'] = ProcessPoolExecutor(max_workers=SCORING_WORKERS)
+
+async def close_scoring_pool(app: web.Application):
+    app['cpu_pool'].shutdown(wait=False)
 
 # Route to handle the Web3 sustainability search and return results in JSON
-@app.route('/api/sustainability', methods=['GET'])
-def get_sustainability():
-    keywords = request.args.get('keywords', default=','.join(WEB3_KEYWORDS), type=str)
+async def get_sustainability(request: web.Request):
+    keywords = request.query.get('keywords', ','.join(WEB3_KEYWORDS))
     keywords = keywords.split(',')
-    requester_id = request.args.get('requester_id', type=str)  # Assume requester_id is provided
+    requester_id = request.query.get('requester_id')  # Assume requester_id is provided
 
-    start_time = time.time()
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    
-    top_repositories = loop.run_until_complete(process_repositories(keywords, requester_id))
+    start_time = time.perf_counter()
+    top_repositories = await process_repositories(request.app['gh_session'], request.app['cpu_pool'],
+                                                  keywords, requester_id)
     
     # Return the response as JSON
     response = {
         'top_repositories': top_repositories,
-        'execution_time': time.time() - start_time
+        'execution_time': time.perf_counter() - start_time
     }
-    return jsonify(response)
+    return web.json_response(response)
+
+def create_app():
+    app = web.Application()
+    app.router.add_get('/api/sustainability', get_sustainability)
+    app.on_startup.append(create_github_session)
+    app.on_startup.append(create_scoring_pool)
+    app.on_cleanup.append(close_github_session)
+    app.on_cleanup.append(close_scoring_pool)
+    return app
 
-# Main function to run the Flask app
+# Main function to run the web app
+# (for multiple workers: gunicorn github_scrape:create_app -k aiohttp.GunicornWebWorker -w 4)
 if __name__ == "__main__":
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    web.run_app(create_app(), host='0.0.0.0', port=5000)
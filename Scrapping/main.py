@@ -1,18 +1,34 @@
 import os
 import sys
 import time
-import json
 import logging
-from typing import Any, Dict, List
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, asdict
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional
 import asyncio
 import aiohttp
+from aiolimiter import AsyncLimiter
 import base64
+import functools
+import inspect
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cachetools import TTLCache
+from diskcache import Cache
+from pybloom_live import ScalableBloomFilter
+import orjson
+import zstandard as zstd
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
 from dotenv import load_dotenv
 # from pymongo import MongoClient  # REMOVED: no longer needed
-from neo4j import GraphDatabase, basic_auth
-import praw
+from neo4j import AsyncGraphDatabase, basic_auth
+
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
 
 # Load environment variables
 load_dotenv()
@@ -40,27 +56,94 @@ NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "password")
 REDDIT_CLIENT_ID = os.getenv("REDDIT_CLIENT_ID")
 REDDIT_CLIENT_SECRET = os.getenv("REDDIT_CLIENT_SECRET")
 REDDIT_USER_AGENT = os.getenv("REDDIT_USER_AGENT")
+REDDIT_TOKEN_URL = "https://www.reddit.com/api/v1/access_token"
+REDDIT_SEARCH_URL = "https://oauth.reddit.com/r/{subreddit}/search"
 
 NEWS_API_TOKEN = os.getenv("NEWS_API_TOKEN")
 NEWS_API_BASE_URL = "https://api.thenewsapi.com/v1/news/all"
+MAX_NEWS_REQUESTS = 90  # Stay under the daily request quota
+NEWS_CONCURRENCY = 5
+NEWS_RATE_LIMIT = 60  # Requests per minute, the provider's published cap
 
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN", "")
 GITHUB_API_URL = 'https://api.github.com/search/repositories'
-GITHUB_CONTENTS_API_URL = 'https://api.github.com/repos/{owner}/{repo}/contents/README.md'
+GITHUB_RAW_README_URL = 'https://raw.githubusercontent.com/{owner}/{repo}/HEAD/README.md'
+GITHUB_README_API_URL = 'https://api.github.com/repos/{owner}/{repo}/readme'
+README_ETAG_TTL = 7 * 24 * 3600  # Seconds a stored README/ETag pair is kept for revalidation
+GITHUB_CONCURRENCY = 10  # In-flight search + README requests against the GitHub API
 
 DEFILLAMA_BASE_URL = "https://api.llama.fi"
 
-driver = GraphDatabase.driver(NEO4J_URI, auth=basic_auth(NEO4J_USER, NEO4J_PASSWORD))
+# Anchored next to this file so every entry point (and working directory) shares one
+# cache, and with it one daily News API quota
+SCRAPER_CACHE_DIR = os.getenv(
+    "SCRAPER_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".scraper_cache")
+)
 
-reddit = praw.Reddit(
-    client_id=REDDIT_CLIENT_ID,
-    client_secret=REDDIT_CLIENT_SECRET,
-    user_agent=REDDIT_USER_AGENT
+def make_neo4j_driver():
+    """Async Neo4j driver for one run; its connection pool belongs to the running event loop."""
+    return AsyncGraphDatabase.driver(
+        NEO4J_URI,
+        auth=basic_auth(NEO4J_USER, NEO4J_PASSWORD),
+        max_connection_pool_size=50,
+        connection_acquisition_timeout=60
+    )
+
+# Pooled, retrying session for the synchronous middleware calls
+http = requests.Session()
+adapter = HTTPAdapter(
+    pool_connections=20,
+    pool_maxsize=20,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
 )
+http.mount("https://", adapter)
+http.mount("http://", adapter)
+
+# -----------------------------------------------------------------------------
+# On-disk memoization for slow-changing upstream data
+# -----------------------------------------------------------------------------
+cache = Cache(SCRAPER_CACHE_DIR)
+
+def cached(ttl: int, key=None):
+    """
+    Memoize a sync or async function in the on-disk cache for `ttl` seconds.
+    `key` maps the call arguments to the cache key (default: all arguments), so
+    unhashable or per-run arguments such as HTTP sessions can be left out.
+    Empty results are not cached, so a failed fetch is retried on the next run.
+    """
+    def deco(fn):
+        def make_key(args, kwargs):
+            parts = key(*args, **kwargs) if key else (args, tuple(sorted(kwargs.items())))
+            return (fn.__name__, parts)
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrap(*args, **kwargs):
+                k = make_key(args, kwargs)
+                value = cache.get(k)
+                if value is None:
+                    value = await fn(*args, **kwargs)
+                    if value:
+                        cache.set(k, value, expire=ttl)
+                return value
+            return async_wrap
+
+        @functools.wraps(fn)
+        def wrap(*args, **kwargs):
+            k = make_key(args, kwargs)
+            value = cache.get(k)
+            if value is None:
+                value = fn(*args, **kwargs)
+                if value:
+                    cache.set(k, value, expire=ttl)
+            return value
+        return wrap
+    return deco
 
 # -----------------------------------------------------------------------------
 # UPDATED: Fetch Companies via Middleware instead of MongoDB
 # -----------------------------------------------------------------------------
+@cached(ttl=1800)
 def get_companies_from_mongo() -> List[str]:
     """
     Fetch company names from your middleware (replaces direct MongoDB calls).
@@ -69,11 +152,13 @@ def get_companies_from_mongo() -> List[str]:
     """
     try:
         url = f"{NGROK_BASE_URL}/api/v1/companies"
-        response = requests.get(url, timeout=10)
+        response = http.get(url, timeout=10)
         response.raise_for_status()
-        data = response.json()
-        # Assuming 'data' is a list of objects that contain "name"
-        return [item["name"] for item in data if "name" in item]
+        payload = orjson.loads(response.content)
+        # The middleware wraps results as {"success", "message", "data": [{"name", ...}]}
+        items = payload.get("data") or [] if isinstance(payload, dict) else payload
+        # Empty names are filtered out by the middleware's query
+        return [item["name"] for item in items]
     except Exception as e:
         logger.error(f"Failed to retrieve companies via middleware: {e}")
         return []
@@ -86,7 +171,7 @@ def update_company_treated(name: str) -> bool:
     try:
         url = f"{NGROK_BASE_URL}/api/v1/companies/update-treated"
         params = {"name": name}
-        response = requests.put(url, params=params, timeout=10)
+        response = http.put(url, params=params, timeout=10)
         response.raise_for_status()
         logger.info(f"Company '{name}' treated status updated successfully.")
         return True
@@ -94,6 +179,122 @@ def update_company_treated(name: str) -> bool:
         logger.error(f"Failed to update treated status for '{name}': {e}")
         return False
 
+# -----------------------------------------------------------------------------
+# Shared HTTP session
+# -----------------------------------------------------------------------------
+def make_http_session() -> aiohttp.ClientSession:
+    """One keep-alive connection pool for every async scraper in a run."""
+    connector = aiohttp.TCPConnector(
+        limit=100, limit_per_host=20, ttl_dns_cache=300, keepalive_timeout=30
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        json_serialize=lambda obj: orjson.dumps(obj).decode("utf-8")
+    )
+
+async def with_http_session(scraper, *args):
+    """Run a single async scraper on its own session (standalone use)."""
+    async with make_http_session() as session:
+        return await scraper(session, *args)
+
+WRITE_BATCH_SIZE = 500
+
+class BatchSink:
+    """
+    Where a scraper stage sends rows as it scrapes them. With a queue, every
+    WRITE_BATCH_SIZE rows are handed to the Neo4j writer straight away, so a stage
+    never holds more than one batch; without one (standalone runs) rows are collected.
+    """
+
+    def __init__(self, kind: str, queue: Optional[asyncio.Queue] = None):
+        self.kind = kind
+        self.queue = queue
+        self.rows = []
+        self.total = 0
+
+    async def add(self, rows: List[Any]):
+        self.rows.extend(rows)
+        self.total += len(rows)
+        if self.queue is None:
+            return
+        while len(self.rows) >= WRITE_BATCH_SIZE:
+            batch = self.rows[:WRITE_BATCH_SIZE]
+            del self.rows[:WRITE_BATCH_SIZE]
+            await self.queue.put((self.kind, batch))
+
+    async def flush(self):
+        """Hand the last partial batch to the writer."""
+        if self.queue is not None and self.rows:
+            batch, self.rows = self.rows, []
+            await self.queue.put((self.kind, batch))
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+MAX_RATE_LIMIT_SLEEP = 300  # Seconds; never park a task longer than this on one reset
+
+def is_retryable(exc: BaseException) -> bool:
+    """Retry transport errors, timeouts, 429/5xx and exhausted rate limits."""
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status in RETRY_STATUSES or exc.status == 403
+    return isinstance(exc, (aiohttp.ClientError, asyncio.TimeoutError))
+
+async def wait_for_rate_limit(headers) -> None:
+    """Sleep as long as the server asks via Retry-After or an exhausted X-RateLimit window."""
+    delay = 0.0
+    if headers.get("Retry-After", "").isdigit():
+        delay = float(headers["Retry-After"])
+    elif headers.get("X-RateLimit-Remaining") == "0" and headers.get("X-RateLimit-Reset", "").isdigit():
+        delay = float(headers["X-RateLimit-Reset"]) - time.time()
+    if delay > 0:
+        delay = min(delay, MAX_RATE_LIMIT_SLEEP)
+        logger.warning(f"Rate limited, sleeping {delay:.0f}s")
+        await asyncio.sleep(delay)
+
+# Jittered exponential backoff shared by every GET that should ride out transient failures
+http_retry = retry(
+    stop=stop_after_attempt(5),
+    wait=wait_exponential_jitter(initial=0.5, max=20),
+    retry=retry_if_exception(is_retryable),
+    reraise=True
+)
+
+async def raise_if_retryable(resp: aiohttp.ClientResponse) -> None:
+    """Raise for a 429/5xx or rate-limited response, after sleeping as long as the server asks."""
+    # GitHub signals both the primary limit (Remaining: 0) and its secondary,
+    # abuse-detection limit (Retry-After) with a 403
+    rate_limited = resp.status == 403 and (
+        resp.headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in resp.headers
+    )
+    if resp.status in RETRY_STATUSES or rate_limited:
+        await wait_for_rate_limit(resp.headers)
+        resp.raise_for_status()
+
+@http_retry
+async def get_json(session: aiohttp.ClientSession, url: str, **kwargs):
+    """
+    GET a JSON document, retrying transient failures with jittered exponential backoff.
+    Returns (status, data); data is None for non-retryable error statuses.
+    """
+    async with session.get(url, **kwargs) as resp:
+        await raise_if_retryable(resp)
+        if resp.status != 200:
+            return resp.status, None
+        data = orjson.loads(await resp.read())
+        if resp.headers.get("X-RateLimit-Remaining") == "0":
+            # Last call in this window; hold off before the next one rather than eat a 403
+            await wait_for_rate_limit(resp.headers)
+        return resp.status, data
+
+@http_retry
+async def get_text(session: aiohttp.ClientSession, url: str, **kwargs):
+    """
+    GET a text document with the same retries as get_json.
+    Returns (status, text, headers); text is None for anything but a 200.
+    """
+    async with session.get(url, **kwargs) as resp:
+        await raise_if_retryable(resp)
+        text = await resp.text(errors="replace") if resp.status == 200 else None
+        return resp.status, text, resp.headers
+
 # -----------------------------------------------------------------------------
 # Reddit Scraper
 # -----------------------------------------------------------------------------
@@ -104,45 +305,143 @@ QUERIES = [
     "web3", "blockchain", "crypto", "decentralized finance", "smart contract"
 ]
 MAX_REDDIT_POSTS = 50
-MAX_WORKERS = 10
+REDDIT_SEARCH_LIMIT = 100  # Reddit's maximum page size
+QUERY_GROUP_SIZE = 8
+REDDIT_CONCURRENCY = 30
+
+def group_queries(queries: List[str], size: int = QUERY_GROUP_SIZE) -> List[tuple]:
+    """Split queries into groups that are searched together as one OR expression."""
+    return [tuple(queries[i:i + size]) for i in range(0, len(queries), size)]
+
+def or_expression(queries: tuple) -> str:
+    """Reddit search expression matching any of the queries (multi-word ones quoted)."""
+    return " OR ".join(f'"{q}"' if " " in q else q for q in queries)
+
+def match_query(text: str, queries: tuple) -> str:
+    """Attribute a post to the first query of its group that it mentions."""
+    lowered = text.lower()
+    return next((q for q in queries if q.lower() in lowered), queries[0])
+
+@dataclass(slots=True)
+class RedditPost:
+    url: str
+    subreddit: str
+    query: str
+    title: str
+    text: str
+    author: str
+    upvotes: int
+    comments: int
+    timestamp_epoch: int
+
+# Reddit app-only tokens live for an hour; refresh a little before they expire
+_reddit_token_cache = TTLCache(maxsize=1, ttl=3300)
+
+async def fetch_reddit_token(session: aiohttp.ClientSession) -> str:
+    """Obtain an app-only OAuth token for the Reddit API, reusing a cached one while valid."""
+    token = _reddit_token_cache.get("token")
+    if token:
+        return token
+    async with session.post(
+        REDDIT_TOKEN_URL,
+        data={"grant_type": "client_credentials"},
+        auth=aiohttp.BasicAuth(REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET),
+        headers={"User-Agent": REDDIT_USER_AGENT}
+    ) as resp:
+        resp.raise_for_status()
+        data = await resp.json(loads=orjson.loads)
+    _reddit_token_cache["token"] = data["access_token"]
+    return data["access_token"]
 
-def scrape_subreddit(subreddit: str, query: str) -> List[Dict[str, Any]]:
-    """Scrape a single subreddit for a given query."""
+@cached(ttl=900, key=lambda session, token, subreddit, queries: (subreddit, queries))
+async def scrape_subreddit(session: aiohttp.ClientSession, token: str,
+                           subreddit: str, queries: tuple) -> List[RedditPost]:
+    """
+    Scrape a single subreddit for a group of queries with one OR search, paging
+    through the listing until the group's combined post budget is reached.
+    """
     results = []
+    # Same budget as one search per query: MAX_REDDIT_POSTS for each query in the group
+    target = MAX_REDDIT_POSTS * len(queries)
+    params = {"q": or_expression(queries), "restrict_sr": "true"}
+    headers = {"Authorization": f"bearer {token}", "User-Agent": REDDIT_USER_AGENT}
     try:
-        for submission in reddit.subreddit(subreddit).search(query, limit=MAX_REDDIT_POSTS):
-            results.append({
-                "subreddit": subreddit,
-                "query": query,
-                "title": submission.title,
-                "text": submission.selftext,
-                "author": submission.author.name if submission.author else "Unknown",
-                "upvotes": submission.score,
-                "comments": submission.num_comments,
-                "url": submission.url,
-                "timestamp": time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(submission.created_utc))
-            })
+        while len(results) < target:
+            params["limit"] = min(REDDIT_SEARCH_LIMIT, target - len(results))
+            status, listing = await get_json(session, REDDIT_SEARCH_URL.format(subreddit=subreddit),
+                                             params=params, headers=headers)
+            if listing is None:
+                logger.warning(f"Reddit search error {status} for r/{subreddit}, queries={queries}")
+                return results
+            data = listing.get("data", {})
+            children = data.get("children", [])
+            for child in children:
+                post = child["data"]
+                title = post.get("title") or ""
+                text = post.get("selftext") or ""
+                results.append(RedditPost(
+                    url=post.get("url"),
+                    subreddit=subreddit,
+                    query=match_query(f"{title} {text}", queries),
+                    title=title,
+                    text=text,
+                    author=post.get("author") or "Unknown",
+                    upvotes=post.get("score"),
+                    comments=post.get("num_comments"),
+                    timestamp_epoch=int(post.get("created_utc", 0))
+                ))
+            # The listing's cursor; absent once the search runs out of results
+            if not children or not data.get("after"):
+                break
+            params["after"] = data["after"]
     except Exception as e:
-        logger.warning(f"Error scraping r/{subreddit} for '{query}': {e}")
+        logger.warning(f"Error scraping r/{subreddit} for {queries}: {e}")
     return results
 
-def run_reddit_scraper() -> List[Dict[str, Any]]:
-    """Run the Reddit scraper concurrently."""
-    all_data = []
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = [
-            executor.submit(scrape_subreddit, subreddit, query)
-            for subreddit in SUBREDDITS for query in QUERIES
-        ]
-        for f in as_completed(futures):
-            all_data.extend(f.result())
-    logger.info(f"[Reddit] Scraped {len(all_data)} total posts.")
-    return all_data
+async def reddit_worker(session: aiohttp.ClientSession, token: str,
+                        pairs: asyncio.Queue, sink: BatchSink):
+    """Consume (subreddit, query group) pairs until the queue is empty."""
+    while True:
+        try:
+            subreddit, queries = pairs.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        await sink.add(await scrape_subreddit(session, token, subreddit, queries))
+
+async def gather_reddit(session: aiohttp.ClientSession, sink: Optional[BatchSink] = None) -> List[RedditPost]:
+    """
+    Search every (subreddit, query group) pair with a fixed pool of workers and one OAuth token.
+    Posts go to `sink` as they arrive; without one they are collected and returned.
+    """
+    sink = sink or BatchSink("reddit")
+    token = await fetch_reddit_token(session)
+    pairs = asyncio.Queue()
+    for subreddit in SUBREDDITS:
+        for queries in group_queries(QUERIES):
+            pairs.put_nowait((subreddit, queries))
+    workers = min(REDDIT_CONCURRENCY, pairs.qsize())
+    await asyncio.gather(*[reddit_worker(session, token, pairs, sink) for _ in range(workers)])
+    logger.info(f"[Reddit] Scraped {sink.total} total posts.")
+    return sink.rows
+
+def run_reddit_scraper() -> List[RedditPost]:
+    """Run the Reddit scraper."""
+    return asyncio.run(with_http_session(gather_reddit))
 
 # -----------------------------------------------------------------------------
 # News API Scraper
 # -----------------------------------------------------------------------------
-def fetch_news_for_company(company: str) -> List[Dict[str, Any]]:
+def take_news_token() -> bool:
+    """
+    Daily token bucket for the News API quota, kept in the on-disk cache so that
+    several runs on the same UTC day share one budget of MAX_NEWS_REQUESTS.
+    """
+    key = ("news_quota", time.strftime("%Y-%m-%d", time.gmtime()))
+    cache.add(key, 0, expire=86400)
+    return cache.incr(key) <= MAX_NEWS_REQUESTS
+
+async def fetch_news_for_company(session: aiohttp.ClientSession, sem: asyncio.Semaphore,
+                                 limiter: AsyncLimiter, company: str) -> List[Dict[str, Any]]:
     """Fetch news articles for a single company."""
     params = {
         "api_token": NEWS_API_TOKEN,
@@ -152,10 +451,13 @@ def fetch_news_for_company(company: str) -> List[Dict[str, Any]]:
         "sort": "published_at"
     }
     try:
-        resp = requests.get(NEWS_API_BASE_URL, params=params, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        if "data" not in data:
+        async with sem, limiter:
+            if not take_news_token():
+                logger.warning(f"Daily News API quota used up, skipping '{company}'")
+                return []
+            status, data = await get_json(session, NEWS_API_BASE_URL, params=params,
+                                          timeout=aiohttp.ClientTimeout(total=10))
+        if not data or "data" not in data:
             return []
         return [
             {
@@ -175,26 +477,43 @@ def fetch_news_for_company(company: str) -> List[Dict[str, Any]]:
         logger.warning(f"Error fetching news for '{company}': {e}")
         return []
 
-def run_news_scraper(companies: List[str]) -> List[Dict[str, Any]]:
+async def gather_news(session: aiohttp.ClientSession, companies: Iterable[str],
+                      sink: Optional[BatchSink] = None) -> List[Dict[str, Any]]:
+    """
+    Fetch news for all companies concurrently, bounded by NEWS_CONCURRENCY and NEWS_RATE_LIMIT.
+    Articles go to `sink` as each company finishes; without one they are collected and returned.
+    """
+    sink = sink or BatchSink("news")
+    sem = asyncio.Semaphore(NEWS_CONCURRENCY)
+    limiter = AsyncLimiter(max_rate=NEWS_RATE_LIMIT, time_period=60)
+    # Stop at ~90 requests to avoid the daily limit; consumes at most that many companies
+    tasks = [
+        fetch_news_for_company(session, sem, limiter, company)
+        for company in islice(companies, MAX_NEWS_REQUESTS)
+    ]
+    if len(tasks) == MAX_NEWS_REQUESTS:
+        logger.info(f"Limiting news requests to {MAX_NEWS_REQUESTS} to avoid daily limit.")
+    for task in asyncio.as_completed(tasks):
+        try:
+            articles = await task
+        except Exception as e:
+            logger.warning(f"News task failed: {e}")
+            continue
+        await sink.add(articles)
+    logger.info(f"[NewsAPI] Fetched {sink.total} news articles.")
+    return sink.rows
+
+def run_news_scraper(companies: Iterable[str]) -> List[Dict[str, Any]]:
     """Run the News API scraper for a list of companies."""
-    all_news = []
-    for idx, company in enumerate(companies):
-        # Example stopping logic at 90 to avoid potential rate limits
-        if idx >= 90:
-            logger.info("Reached ~90 requests, stopping to avoid daily limit.")
-            break
-        results = fetch_news_for_company(company)
-        all_news.extend(results)
-        time.sleep(2)  # Respect rate-limits or courtesy wait
-    logger.info(f"[NewsAPI] Fetched {len(all_news)} news articles.")
-    return all_news
+    return asyncio.run(with_http_session(gather_news, companies))
 
 # -----------------------------------------------------------------------------
 # GitHub Scraper
 # -----------------------------------------------------------------------------
 WEB3_KEYWORDS = ["web3", "ethereum", "blockchain", "cryptocurrency"]
 
-async def fetch_repos_for_keyword(session: aiohttp.ClientSession, keyword: str, page: int) -> List[Dict[str, Any]]:
+async def fetch_repos_for_keyword(session: aiohttp.ClientSession, sem: asyncio.Semaphore,
+                                  keyword: str, page: int) -> List[Dict[str, Any]]:
     """Fetch repositories for a keyword."""
     params = {
         "q": f"{keyword} in:description,readme,topics",
@@ -204,253 +523,373 @@ async def fetch_repos_for_keyword(session: aiohttp.ClientSession, keyword: str,
         "page": page
     }
     headers = {"Authorization": f"token {GITHUB_TOKEN}"}
-    async with session.get(GITHUB_API_URL, params=params, headers=headers) as resp:
-        if resp.status == 200:
-            data = await resp.json()
-            return data.get("items", [])
-        else:
-            logger.warning(f"GitHub fetch error {resp.status} for keyword={keyword}, page={page}")
-            return []
+    try:
+        async with sem:
+            status, data = await get_json(session, GITHUB_API_URL, params=params, headers=headers)
+    except Exception as e:
+        logger.warning(f"GitHub fetch failed for keyword={keyword}, page={page}: {e}")
+        return []
+    if data is None:
+        logger.warning(f"GitHub fetch error {status} for keyword={keyword}, page={page}")
+        return []
+    return data.get("items", [])
 
-async def fetch_readme(session: aiohttp.ClientSession, owner: str, repo: str) -> str:
-    """Fetch README content for a repository."""
-    url = GITHUB_CONTENTS_API_URL.format(owner=owner, repo=repo)
-    headers = {"Authorization": f"token {GITHUB_TOKEN}"}
-    async with session.get(url, headers=headers) as resp:
-        if resp.status == 200:
-            content_json = await resp.json()
-            encoded = content_json.get("content", "")
-            try:
-                return base64.b64decode(encoded).decode("utf-8")
-            except Exception:
-                return ""
+async def fetch_readme(session: aiohttp.ClientSession, sem: asyncio.Semaphore, owner: str, repo: str) -> str:
+    """
+    Fetch README content for a repository. The raw endpoint serves README.md as
+    plain text (no JSON, no base64); the API's /readme lookup, which also finds
+    other README names and extensions, is only used when that 404s.
+    """
+    # Revalidate with the stored ETag; a 304 carries no body
+    cache_key = ("readme", owner, repo)
+    etag, cached_text = cache.get(cache_key, default=(None, ""))
+    headers = {"Accept": "text/plain", "Accept-Encoding": "gzip"}
+    if etag:
+        headers["If-None-Match"] = etag
+    async with sem:
+        status, text, resp_headers = await get_text(
+            session, GITHUB_RAW_README_URL.format(owner=owner, repo=repo), headers=headers
+        )
+        if status == 304:
+            return cached_text
+        if status == 200:
+            if resp_headers.get("ETag"):
+                cache.set(cache_key, (resp_headers["ETag"], text), expire=README_ETAG_TTL)
+            return text
+        if status != 404:
+            return ""
+        url = GITHUB_README_API_URL.format(owner=owner, repo=repo)
+        headers = {"Authorization": f"token {GITHUB_TOKEN}"}
+        status, content_json = await get_json(session, url, headers=headers)
+    if content_json is None:
+        return ""
+    encoded = content_json.get("content", "")
+    try:
+        return base64.b64decode(encoded).decode("utf-8")
+    except Exception:
         return ""
 
-async def gather_github_repos(keywords: List[str]) -> List[Dict[str, Any]]:
-    """Gather top repositories for given keywords."""
-    async with aiohttp.ClientSession() as session:
-        seen_ids = set()
-        all_repos = []
-        for page in range(1, 3):  # Fetch up to 2 pages per keyword
-            tasks = [fetch_repos_for_keyword(session, kw, page) for kw in keywords]
-            results = await asyncio.gather(*tasks)
-            for repos_for_kw in results:
-                for repo in repos_for_kw:
-                    if repo["id"] not in seen_ids:
-                        seen_ids.add(repo["id"])
-                        owner = repo["owner"]["login"]
-                        name = repo["name"]
-                        readme_text = await fetch_readme(session, owner, name)
-                        all_repos.append({
-                            "full_name": repo["full_name"],
-                            "description": repo.get("description", ""),
-                            "url": repo["html_url"],
-                            "stars": repo["stargazers_count"],
-                            "forks": repo["forks_count"],
-                            "issues": repo["open_issues_count"],
-                            "readme": readme_text
-                        })
-    return all_repos
+async def gather_github_repos(session: aiohttp.ClientSession, keywords: List[str],
+                              sink: Optional[BatchSink] = None) -> List[Dict[str, Any]]:
+    """
+    Gather top repositories for given keywords. Each repo goes to `sink` as soon as
+    its README is in; without one they are collected and returned.
+    """
+    sink = sink or BatchSink("github")
+    sem = asyncio.Semaphore(GITHUB_CONCURRENCY)
+    # Phase 1: every search page for every keyword at once, deduplicated by repo id.
+    # Bounded-memory dedup; a ~1e-6 false-positive rate is acceptable
+    seen_ids = ScalableBloomFilter(initial_capacity=10000, error_rate=1e-6)
+    unique = []
+    results = await asyncio.gather(*[
+        fetch_repos_for_keyword(session, sem, kw, page)
+        for page in range(1, 3)  # Fetch up to 2 pages per keyword
+        for kw in keywords
+    ])
+    for repos_for_kw in results:
+        for repo in repos_for_kw:
+            if repo["id"] in seen_ids:
+                continue
+            seen_ids.add(repo["id"])
+            unique.append(repo)
+
+    # Phase 2: all READMEs concurrently
+    async def with_readme(repo):
+        try:
+            readme_text = await fetch_readme(session, sem, repo["owner"]["login"], repo["name"])
+        except Exception as e:
+            logger.warning(f"README fetch failed for {repo['full_name']}: {e}")
+            readme_text = ""
+        return {
+            "full_name": repo["full_name"],
+            "description": repo.get("description", ""),
+            "url": repo["html_url"],
+            "stars": repo["stargazers_count"],
+            "forks": repo["forks_count"],
+            "issues": repo["open_issues_count"],
+            "readme": readme_text
+        }
+
+    for task in asyncio.as_completed([with_readme(repo) for repo in unique]):
+        await sink.add([await task])
+    logger.info(f"[GitHub] Found {sink.total} relevant repos.")
+    return sink.rows
 
 def run_github_scraper(keywords: List[str]) -> List[Dict[str, Any]]:
     """Run the GitHub scraper."""
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    results = loop.run_until_complete(gather_github_repos(keywords))
-    loop.close()
-    logger.info(f"[GitHub] Found {len(results)} relevant repos.")
-    return results
+    return asyncio.run(with_http_session(gather_github_repos, keywords))
 
 # -----------------------------------------------------------------------------
 # DeFi Llama Scraper
 # -----------------------------------------------------------------------------
 PROTOCOLS = ["uniswap", "aave", "sushiswap"]
+DEFILLAMA_CONCURRENCY = 5
 
 ENDPOINTS_BY_PROTOCOL = {
     "/protocol/{}": "historical_tvl",
     "/tvl/{}": "current_tvl"
 }
 
-def fetch_endpoint_data(url: str, is_optional=False) -> Any:
-    """Fetch data from a DeFi Llama endpoint."""
+DEFILLAMA_DROP_FIELDS = frozenset({"chainBalances", "tokens", "chainsPrices"})
+
+def preprocess_defillama_data(data: Any) -> Any:
+    """Preprocess DeFi Llama data by dropping the bulky per-chain/token breakdowns."""
+    if isinstance(data, dict):
+        return {k: v for k, v in data.items() if k not in DEFILLAMA_DROP_FIELDS}
+    if isinstance(data, list):
+        return [
+            {k: v for k, v in item.items() if k not in DEFILLAMA_DROP_FIELDS}
+            if isinstance(item, dict) else item
+            for item in data
+        ]
+    return data
+
+@cached(ttl=3600, key=lambda session, url, is_optional=False: url)
+async def fetch_endpoint_data(session: aiohttp.ClientSession, url: str, is_optional=False) -> Any:
+    """Fetch data from a DeFi Llama endpoint, pruned right after the parse."""
     try:
-        resp = requests.get(url, timeout=10)
-        if resp.status_code == 404 and is_optional:
+        status, data = await get_json(session, url, timeout=aiohttp.ClientTimeout(total=10))
+        if status == 404 and is_optional:
             logger.warning(f"[DeFiLlama] 404 on optional endpoint: {url}")
-            return None
-        resp.raise_for_status()
-        return resp.json()
+        elif data is None:
+            logger.error(f"[DeFiLlama] Error {status} fetching {url}")
+        # Prune before the result is cached so the bulky fields are never stored or reloaded
+        return preprocess_defillama_data(data)
     except Exception as e:
         logger.error(f"[DeFiLlama] Error fetching {url}: {e}")
         return None
 
-def preprocess_defillama_data(data: Any) -> Any:
-    """Preprocess DeFi Llama data."""
-    if isinstance(data, dict):
-        for field in ["chainBalances", "tokens", "chainsPrices"]:
-            data.pop(field, None)
-    elif isinstance(data, list):
-        for item in data:
-            if isinstance(item, dict):
-                for field in ["chainBalances", "tokens", "chainsPrices"]:
-                    item.pop(field, None)
-    return data
+async def gather_defillama(session: aiohttp.ClientSession,
+                           sink: Optional[BatchSink] = None) -> List[Dict[str, Any]]:
+    """
+    Collect DeFi Llama endpoint data for every protocol concurrently. Each result goes
+    to `sink` as it arrives; without one they are collected and returned.
+    """
+    sink = sink or BatchSink("defillama")
+    sem = asyncio.Semaphore(DEFILLAMA_CONCURRENCY)
+
+    async def fetch_limited(protocol, name, url):
+        async with sem:
+            return protocol, name, await fetch_endpoint_data(session, url, is_optional=False)
+
+    targets = [
+        (protocol, name, DEFILLAMA_BASE_URL + endpoint_template.format(protocol))
+        for protocol in PROTOCOLS
+        for endpoint_template, name in ENDPOINTS_BY_PROTOCOL.items()
+    ]
+    for task in asyncio.as_completed([fetch_limited(*target) for target in targets]):
+        protocol, name, raw_data = await task
+        if raw_data:
+            await sink.add([{
+                "protocol": protocol,
+                "endpoint_name": name,
+                "data": raw_data
+            }])
+    logger.info(f"[DeFiLlama] Collected {sink.total} endpoint results.")
+    return sink.rows
 
 def run_defillama_scraper() -> List[Dict[str, Any]]:
     """Run the DeFi Llama scraper."""
-    results = []
-    for protocol in PROTOCOLS:
-        for endpoint_template, name in ENDPOINTS_BY_PROTOCOL.items():
-            url = DEFILLAMA_BASE_URL + endpoint_template.format(protocol)
-            raw_data = fetch_endpoint_data(url, is_optional=False)
-            if raw_data:
-                processed = preprocess_defillama_data(raw_data)
-                results.append({
-                    "protocol": protocol,
-                    "endpoint_name": name,
-                    "data": processed
-                })
-    logger.info(f"[DeFiLlama] Collected {len(results)} endpoint results.")
-    return results
+    return asyncio.run(with_http_session(gather_defillama))
 
 # -----------------------------------------------------------------------------
 # Neo4j Storage
 # -----------------------------------------------------------------------------
-def store_reddit_data_in_neo4j(posts: List[Dict[str, Any]]):
-    """Store Reddit posts in Neo4j."""
-    with driver.session() as session:
-        for post in posts:
-            session.write_transaction(_merge_reddit_post, post)
-
-def _merge_reddit_post(tx, post: Dict[str, Any]):
-    query = """
-    MERGE (rp:RedditPost { url: $url })
-    ON CREATE SET
-      rp.subreddit = $subreddit,
-      rp.query = $query,
-      rp.title = $title,
-      rp.text = $text,
-      rp.author = $author,
-      rp.upvotes = $upvotes,
-      rp.comments = $comments,
-      rp.timestamp = $timestamp,
-      rp.createdAt = timestamp()
-    """
-    tx.run(query, **post)
+NEO4J_BATCH_SIZE = 1000
+
+# Fixed query text so every batch hits the same server-side plan cache entry
+REDDIT_MERGE_Q = """
+UNWIND $rows AS row
+MERGE (rp:RedditPost { url: row.url })
+ON CREATE SET rp += row,
+  rp.timestamp = datetime({ epochSeconds: row.timestamp_epoch }),
+  rp.createdAt = timestamp()
+"""
+
+NEWS_MERGE_Q = """
+UNWIND $rows AS row
+MERGE (na:NewsArticle { url: row.url })
+ON CREATE SET na += row, na.createdAt = timestamp()
+"""
+
+GITHUB_MERGE_Q = """
+UNWIND $rows AS row
+MERGE (gh:GitHubRepo { full_name: row.full_name })
+ON CREATE SET gh += row, gh.createdAt = timestamp()
+"""
+
+DEFILLAMA_MERGE_Q = """
+UNWIND $rows AS row
+MERGE (p:Protocol { name: row.protocol })
+ON CREATE SET p.createdAt = timestamp()
+MERGE (e:EndpointData { endpoint: row.endpoint_name, protocol: row.protocol })
+ON CREATE SET e.createdAt = timestamp(), e.data_zstd = row.data_zstd
+MERGE (p)-[r:HAS_ENDPOINT_DATA]->(e)
+ON CREATE SET r.createdAt = timestamp()
+"""
+
+# Every MERGE key above needs an index, or each MERGE in a batch scans the whole label
+SCHEMA_STATEMENTS = [
+    "CREATE CONSTRAINT reddit_url IF NOT EXISTS FOR (rp:RedditPost) REQUIRE rp.url IS UNIQUE",
+    "CREATE CONSTRAINT news_url IF NOT EXISTS FOR (na:NewsArticle) REQUIRE na.url IS UNIQUE",
+    "CREATE CONSTRAINT github_full_name IF NOT EXISTS FOR (gh:GitHubRepo) REQUIRE gh.full_name IS UNIQUE",
+    "CREATE CONSTRAINT protocol_name IF NOT EXISTS FOR (p:Protocol) REQUIRE p.name IS UNIQUE",
+    "CREATE INDEX endpoint_data_key IF NOT EXISTS FOR (e:EndpointData) ON (e.endpoint, e.protocol)",
+]
 
-def store_news_data_in_neo4j(articles: List[Dict[str, Any]]):
+async def _ensure_schema(driver):
+    """Create the constraints and indexes the MERGE queries rely on (idempotent)."""
+    async with driver.session(database="neo4j") as session:
+        for statement in SCHEMA_STATEMENTS:
+            result = await session.run(statement)
+            await result.consume()
+
+def chunks(rows: List[Dict[str, Any]], size: int):
+    """Yield successive slices of at most `size` rows."""
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+async def bulk_merge(tx, rows: List[Dict[str, Any]], cypher: str):
+    """Transaction function: MERGE a whole batch of rows with one UNWIND statement."""
+    result = await tx.run(cypher, rows=rows)
+    await result.consume()
+
+async def write_batch(driver, query: str, batch: List[Dict[str, Any]]):
+    """Write one batch in its own session (sessions are not safe for concurrent use)."""
+    async with driver.session(database="neo4j", default_access_mode="WRITE") as session:
+        await session.execute_write(bulk_merge, batch, query)
+
+async def write_in_batches(driver, query: str, rows: List[Dict[str, Any]]):
+    """Run an UNWIND $rows query once per batch, with batches in flight together over the driver's pool."""
+    await asyncio.gather(*[write_batch(driver, query, batch) for batch in chunks(rows, NEO4J_BATCH_SIZE)])
+
+async def store_reddit_data_in_neo4j(driver, posts: List[RedditPost]):
+    """Store Reddit posts in Neo4j."""
+    # Posts only become dicts here, at the point the UNWIND parameter needs them.
+    # A null MERGE key would fail the whole UNWIND batch, so such posts are dropped up front
+    rows = [asdict(post) for post in posts if post.url]
+    if len(rows) < len(posts):
+        logger.warning(f"[Neo4j] Skipping {len(posts) - len(rows)} Reddit posts without a url")
+    await write_in_batches(driver, REDDIT_MERGE_Q, rows)
+
+async def store_news_data_in_neo4j(driver, articles: List[Dict[str, Any]]):
     """Store news articles in Neo4j."""
-    with driver.session() as session:
-        for art in articles:
-            session.write_transaction(_merge_news_article, art)
-
-def _merge_news_article(tx, art: Dict[str, Any]):
-    query = """
-    MERGE (na:NewsArticle { url: $url })
-    ON CREATE SET
-      na.company = $company,
-      na.title = $title,
-      na.description = $description,
-      na.snippet = $snippet,
-      na.image_url = $image_url,
-      na.published_at = $published_at,
-      na.source = $source,
-      na.categories = $categories,
-      na.createdAt = timestamp()
-    """
-    categories = ", ".join(art.get("categories", []))
-    params = {
-        "url": art.get("url", "unknown"),
-        "company": art.get("company"),
-        "title": art.get("title"),
-        "description": art.get("description"),
-        "snippet": art.get("snippet"),
-        "image_url": art.get("image_url"),
-        "published_at": art.get("published_at"),
-        "source": art.get("source"),
-        "categories": categories
-    }
-    tx.run(query, **params)
-
-def store_github_data_in_neo4j(repos: List[Dict[str, Any]]):
+    rows = [
+        {
+            # `or`, not a .get default: a present-but-null url would fail the whole UNWIND batch
+            "url": art.get("url") or "unknown",
+            "company": art.get("company"),
+            "title": art.get("title"),
+            "description": art.get("description"),
+            "snippet": art.get("snippet"),
+            "image_url": art.get("image_url"),
+            "published_at": art.get("published_at"),
+            "source": art.get("source"),
+            "categories": ", ".join(art.get("categories") or [])
+        }
+        for art in articles
+    ]
+    await write_in_batches(driver, NEWS_MERGE_Q, rows)
+
+async def store_github_data_in_neo4j(driver, repos: List[Dict[str, Any]]):
     """Store GitHub repositories in Neo4j."""
-    with driver.session() as session:
-        for repo in repos:
-            session.write_transaction(_merge_github_repo, repo)
-
-def _merge_github_repo(tx, repo: Dict[str, Any]):
-    query = """
-    MERGE (gh:GitHubRepo { full_name: $full_name })
-    ON CREATE SET
-      gh.description = $description,
-      gh.url = $url,
-      gh.stars = $stars,
-      gh.forks = $forks,
-      gh.issues = $issues,
-      gh.readme = $readme,
-      gh.createdAt = timestamp()
-    """
-    tx.run(query, **repo)
+    await write_in_batches(driver, GITHUB_MERGE_Q, repos)
+
+# Historical TVL is large, repetitive JSON; store it as zstd-compressed orjson bytes
+ENDPOINT_DATA_COMPRESSOR = zstd.ZstdCompressor(level=7)
 
-def store_defillama_data_in_neo4j(results: List[Dict[str, Any]]):
+async def store_defillama_data_in_neo4j(driver, results: List[Dict[str, Any]]):
     """Store DeFi Llama data in Neo4j."""
-    with driver.session() as session:
-        for item in results:
-            session.write_transaction(_merge_protocol_and_data, item)
-
-def _merge_protocol_and_data(tx, item: Dict[str, Any]):
-    protocol_name = item["protocol"]
-    endpoint_name = item["endpoint_name"]
-    data_json = json.dumps(item["data"])
-
-    # Merge protocol node
-    tx.run("""
-    MERGE (p:Protocol { name: $protocol_name })
-    ON CREATE SET p.createdAt = timestamp()
-    """, protocol_name=protocol_name)
-
-    # Merge endpoint data
-    tx.run("""
-    MERGE (e:EndpointData { endpoint: $endpoint_name, protocol: $protocol_name })
-    ON CREATE SET e.createdAt = timestamp(), e.data = $data_json
-    """, endpoint_name=endpoint_name, protocol_name=protocol_name, data_json=data_json)
-
-    # Relationship
-    tx.run("""
-    MATCH (p:Protocol { name: $protocol_name })
-    MATCH (e:EndpointData { endpoint: $endpoint_name, protocol: $protocol_name })
-    MERGE (p)-[r:HAS_ENDPOINT_DATA]->(e)
-    ON CREATE SET r.createdAt = timestamp()
-    """, protocol_name=protocol_name, endpoint_name=endpoint_name)
+    rows = [
+        {
+            "protocol": item["protocol"],
+            "endpoint_name": item["endpoint_name"],
+            "data_zstd": ENDPOINT_DATA_COMPRESSOR.compress(orjson.dumps(item["data"]))
+        }
+        for item in results
+    ]
+    await write_in_batches(driver, DEFILLAMA_MERGE_Q, rows)
 
 # -----------------------------------------------------------------------------
 # Main
 # -----------------------------------------------------------------------------
-def main():
-    start_time = time.time()
-    logger.info("=== Starting multi-scraper workflow ===")
-
-    # 1) Reddit Scraper
-    reddit_posts = run_reddit_scraper()
-    store_reddit_data_in_neo4j(reddit_posts)
+STORE_BY_KIND = {
+    "reddit": store_reddit_data_in_neo4j,
+    "news": store_news_data_in_neo4j,
+    "github": store_github_data_in_neo4j,
+    "defillama": store_defillama_data_in_neo4j,
+}
 
-    # 2) News API Scraper
-    companies = get_companies_from_mongo()  # Now retrieves from middleware
-    news_articles = run_news_scraper(companies)
-    store_news_data_in_neo4j(news_articles)
+async def neo4j_writer(queue: asyncio.Queue, driver):
+    """
+    Single consumer: drain scraped batches into Neo4j until the None sentinel arrives.
+    A failed batch is logged and skipped so the queue keeps draining for every stage.
+    """
+    while True:
+        item = await queue.get()
+        if item is None:
+            break
+        kind, batch = item
+        try:
+            await STORE_BY_KIND[kind](driver, batch)
+        except Exception as e:
+            logger.error(f"[Neo4j] Failed to store {len(batch)} {kind} rows: {e}")
+            continue
+        logger.info(f"[Neo4j] Stored {len(batch)} {kind} rows.")
+
+async def produce(queue: asyncio.Queue, kind: str, gather, *args):
+    """Run one scraper stage, streaming its rows to the writer in batches while it scrapes."""
+    sink = BatchSink(kind, queue)
+    try:
+        await gather(*args, sink=sink)
+    finally:
+        # Whatever a failed stage scraped before it failed is still stored
+        await sink.flush()
 
+async def run_all(companies: Iterable[str]):
+    """
+    Run the Reddit, News, GitHub and DeFi Llama scrapers concurrently over one
+    shared HTTP session, streaming each stage's rows into Neo4j in batches as they are scraped.
+    """
+    driver = make_neo4j_driver()
+    queue = asyncio.Queue(maxsize=10)
+    writer = asyncio.create_task(neo4j_writer(queue, driver))
+    try:
+        await _ensure_schema(driver)
+        async with make_http_session() as session:
+            stages = {
+                "reddit": (gather_reddit, session),
+                "news": (gather_news, session, companies),
+                "github": (gather_github_repos, session, WEB3_KEYWORDS),
+                "defillama": (gather_defillama, session),
+            }
+            # A failing stage must not cancel the others or drop their results
+            outcomes = await asyncio.gather(
+                *[produce(queue, kind, *stage) for kind, stage in stages.items()],
+                return_exceptions=True
+            )
+            for kind, outcome in zip(stages, outcomes):
+                if isinstance(outcome, Exception):
+                    logger.error(f"[{kind}] stage failed: {outcome}")
+    finally:
+        try:
+            await queue.put(None)
+            await writer
+        finally:
+            await driver.close()
 
+def main():
+    start_time = time.perf_counter()
+    logger.info("=== Starting multi-scraper workflow ===")
 
-    # 3) GitHub Scraper
-    github_repos = run_github_scraper(WEB3_KEYWORDS)
-    store_github_data_in_neo4j(github_repos)
+    companies = get_companies_from_mongo()  # Now retrieves from middleware
 
-    # 4) DeFi Llama
-    defillama_results = run_defillama_scraper()
-    store_defillama_data_in_neo4j(defillama_results)
+    # Scrapers share one HTTP session; a writer task streams their batches
+    # into Neo4j while the other stages are still running
+    asyncio.run(run_all(companies))
 
     logger.info("=== All scrapers finished. Data stored in Neo4j. ===")
-    logger.info(f"Total execution time: {time.time() - start_time:.2f}s")
+    logger.info(f"Total execution time: {time.perf_counter() - start_time:.2f}s")
 
 if __name__ == "__main__":
     main()
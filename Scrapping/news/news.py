@@ -1,85 +1,46 @@
-import requests
-import pandas as pd
-import time
-import os 
-from dotenv import load_dotenv
-dotenv_path = r"C:\Users\medya\OneDrive\Documents\Strong_gradient\Scrapping\.env"
-load_dotenv(dotenv_path=dotenv_path)
-API_TOKEN = os.getenv("NEWS_API_TOKEN")  
-BASE_URL = "https://api.thenewsapi.com/v1/news/all"  
+import asyncio
+import csv
+import os
+import sys
 
-# List of Web3 companies to search for
-companies = ["Ethereum", "Solana", "Polygon", "Chainlink", "Uniswap", "Avalanche"]
+# Thin CLI around the pipeline's async news scraper (same rate limits and daily quota)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from main import gather_news, with_http_session
 
-# Function to fetch news for a given company
-def fetch_news(company_name):
-    params = {
-        "api_token": API_TOKEN,
-        "language": "en",  # Fetch English news
-        "search": company_name,  # Search for company name in news
-        "limit": 3,  # Maximum allowed articles per request (due to free plan limitations)
-        "sort": "published_at",  # Sort results by published date
-    }
+OUTPUT_CSV = "web3_companies_news.csv"
 
-    try:
-        print(f"Fetching news for: {company_name}...")
-        response = requests.get(BASE_URL, params=params)
-        response.raise_for_status()  # Raise error for bad status codes
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching news for {company_name}: {e}")
-        return None
+# List of Web3 companies to search for
+companies = ["Ethereum", "Solana", "Polygon", "Chainlink", "Uniswap", "Avalanche"]
 
-# Function to process the API response
-def process_news(data, company_name):
-    if not data or "data" not in data:
-        print(f"No news found for {company_name}.")
-        return []
-    
-    news_list = []
-    for article in data["data"]:
-        news_list.append({
-            "Company": company_name,
-            "Title": article.get("title"),
-            "Description": article.get("description"),
-            "Snippet": article.get("snippet"),
-            "URL": article.get("url"),
-            "Image URL": article.get("image_url"),
-            "Published At": article.get("published_at"),
-            "Source": article.get("source"),
-            "Categories": ", ".join(article.get("categories", [])),
-        })
-    
-    return news_list
+# CSV column -> article field
+CSV_COLUMNS = {
+    "Company": "company",
+    "Title": "title",
+    "Description": "description",
+    "Snippet": "snippet",
+    "URL": "url",
+    "Image URL": "image_url",
+    "Published At": "published_at",
+    "Source": "source",
+    "Categories": "categories",
+}
+
+def write_news_csv(articles, path=OUTPUT_CSV):
+    """Write articles row by row with the csv module (no DataFrame in between)."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        for article in articles:
+            row = [article.get(field) for field in CSV_COLUMNS.values()]
+            row[-1] = ", ".join(article.get("categories") or [])
+            writer.writerow(row)
 
 # Main execution
 if __name__ == "__main__":
-    all_news = []
-    request_count = 0  # Track API requests
-    MAX_REQUESTS = 100  # Free plan allows 100 requests per day
-
-    for company in companies:
-        if request_count >= MAX_REQUESTS:  # Stop if daily limit reached
-            print("Daily API limit reached. Stopping.")
-            break
-
-        news_data = fetch_news(company)
-        request_count += 1  # Increment request count
-        
-        if news_data:
-            news_articles = process_news(news_data, company)
-            all_news.extend(news_articles)
-        
-        # API rate-limiting (short delay between requests)
-        time.sleep(2)  
+    all_news = asyncio.run(with_http_session(gather_news, companies))
 
     if all_news:
-        news_df = pd.DataFrame(all_news)
-        news_df.to_csv("web3_companies_news.csv", index=False)
-        print("News data saved to 'web3_companies_news.csv' successfully!")
-
-        # Display DataFrame
-        #import ace_tools as tools
-        #tools.display_dataframe_to_user(name="Web3 Companies News", dataframe=news_df)
+        write_news_csv(all_news)
+        print(f"News data saved to '{OUTPUT_CSV}' successfully!")
     else:
         print("No news articles found.")
@@ -62,25 +62,50 @@ func (s *Server) setupRoutes() {
 	s.router.Use(s.loggingMiddleware)
 }
 
-// fetchAllCompaniesHandler fetches all companies
+// fetchAllCompaniesHandler streams all companies as they come off the cursor,
+// in the same envelope sendResponse would produce
 func (s *Server) fetchAllCompaniesHandler(w http.ResponseWriter, r *http.Request) {
 	ctx, cancel := context.WithTimeout(r.Context(), 10*time.Second)
 	defer cancel()
 
-	companies, err := s.batchProcessor.FetchAllCompanies(ctx)
+	enc := json.NewEncoder(w)
+	written := 0
+	err := s.batchProcessor.StreamCompanies(ctx, func(company middleware.Company) error {
+		if written == 0 {
+			w.Header().Set("Content-Type", "application/json")
+			w.WriteHeader(http.StatusOK)
+			if _, err := w.Write([]byte(`{"success":true,"message":"Companies fetched successfully","data":[`)); err != nil {
+				return err
+			}
+		} else if _, err := w.Write([]byte(",")); err != nil {
+			return err
+		}
+		written++
+		return enc.Encode(company)
+	})
+
 	if err != nil {
-		s.sendResponse(w, http.StatusInternalServerError, APIResponse{
-			Success: false,
-			Message: "Failed to fetch companies: " + err.Error(),
-		})
+		if written == 0 {
+			s.sendResponse(w, http.StatusInternalServerError, APIResponse{
+				Success: false,
+				Message: "Failed to fetch companies: " + err.Error(),
+			})
+			return
+		}
+		// Headers are already sent; all we can do is cut the response short
+		log.Printf("Error streaming companies after %d records: %v", written, err)
 		return
 	}
 
-	s.sendResponse(w, http.StatusOK, APIResponse{
-		Success: true,
-		Message: "Companies fetched successfully",
-		Data:    companies,
-	})
+	if written == 0 {
+		s.sendResponse(w, http.StatusOK, APIResponse{
+			Success: true,
+			Message: "Companies fetched successfully",
+			Data:    []middleware.Company{},
+		})
+		return
+	}
+	w.Write([]byte("]}"))
 }
 
 // healthCheckHandler performs a health check
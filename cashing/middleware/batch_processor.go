@@ -37,7 +37,11 @@ func NewBatchProcessor(uri, dbName, collName string, batchSize, numWorkers int)
 		ApplyURI(uri).
 		SetConnectTimeout(5 * time.Second).
 		SetServerSelectionTimeout(5 * time.Second).
-		SetMaxPoolSize(uint64(numWorkers * 2))
+		SetSocketTimeout(10 * time.Second).
+		SetMaxPoolSize(uint64(numWorkers * 2)).
+		SetMinPoolSize(uint64(numWorkers)).
+		// Wire compression for the batch upserts; falls back to none if the server lacks both
+		SetCompressors([]string{"zstd", "snappy"})
 
 	client, err := mongo.Connect(ctx, clientOptions)
 	if err != nil {
@@ -81,7 +85,7 @@ func (bp *BatchProcessor) ProcessBatch(ctx context.Context, companies []Company)
 		return 0, nil
 	}
 
-	var operations []mongo.WriteModel
+	operations := make([]mongo.WriteModel, 0, len(companies))
 	for _, company := range companies {
 		operation := mongo.NewUpdateOneModel().
 			SetFilter(bson.M{"name": company.Name}).
@@ -134,20 +138,49 @@ func (bp *BatchProcessor) UpdateTreatedField(ctx context.Context, companyName st
 	return nil
 }
 
-// FetchAllCompanies retrieves all companies from the database
-func (bp *BatchProcessor) FetchAllCompanies(ctx context.Context) ([]Company, error) {
+// StreamCompanies iterates the cursor lazily, handing each company to fn as it
+// is decoded instead of materializing the whole collection first
+func (bp *BatchProcessor) StreamCompanies(ctx context.Context, fn func(Company) error) error {
+	// Only the fields Company decodes, in large cursor batches to cut getMore round trips
 	opts := options.Find().
-		SetSort(bson.D{{Key: "name", Value: 1}})
+		SetSort(bson.D{{Key: "name", Value: 1}}).
+		SetProjection(bson.M{"_id": 0, "name": 1, "address": 1, "treated": 1}).
+		SetBatchSize(1000)
 
-	cursor, err := bp.collection.Find(ctx, bson.M{}, opts)
+	// Only companies with a usable name; the name index serves this predicate
+	filter := bson.M{"name": bson.M{"$exists": true, "$nin": bson.A{nil, ""}}}
+
+	cursor, err := bp.collection.Find(ctx, filter, opts)
 	if err != nil {
-		return nil, fmt.Errorf("failed to fetch companies: %v", err)
+		return fmt.Errorf("failed to fetch companies: %v", err)
 	}
 	defer cursor.Close(ctx)
 
+	for cursor.Next(ctx) {
+		var company Company
+		if err := cursor.Decode(&company); err != nil {
+			return fmt.Errorf("failed to decode company: %v", err)
+		}
+		if err := fn(company); err != nil {
+			return err
+		}
+	}
+	if err := cursor.Err(); err != nil {
+		return fmt.Errorf("failed to iterate companies: %v", err)
+	}
+
+	return nil
+}
+
+// FetchAllCompanies retrieves all companies from the database
+func (bp *BatchProcessor) FetchAllCompanies(ctx context.Context) ([]Company, error) {
 	var companies []Company
-	if err = cursor.All(ctx, &companies); err != nil {
-		return nil, fmt.Errorf("failed to decode companies: %v", err)
+	err := bp.StreamCompanies(ctx, func(company Company) error {
+		companies = append(companies, company)
+		return nil
+	})
+	if err != nil {
+		return nil, err
 	}
 
 	return companies, nil